@@ -147,3 +147,41 @@ CORS_ALLOW_ALL_ORIGINS = True
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Extra sheet headers recognised as physical tests by the student import,
+# e.g. {'Sit & Reach': {'test': 'Sit and Reach', 'unit': 'cm'}}
+STUDENT_IMPORT_TEST_COLUMNS = {}
+
+# Cohorts student percentiles are ranked in: 'district' compares students of
+# the same grade and gender across all schools, 'school' within their school
+STUDENT_PERCENTILE_SCOPE = 'district'
+
+# Seconds a process keeps its cached norm tables before reloading them
+STUDENT_NORM_CACHE_SECONDS = 300
+
+# Worker processes fitting the clustering partitions, -1 uses every core
+REPORT_CLUSTER_JOBS = -1
+# Split the school x grade clustering partitions by gender as well
+REPORT_CLUSTER_BY_GENDER = False
+# A stored cluster model is refitted once at least REPORT_CLUSTER_MIN_ASSIGNED
+# students were assigned to it and either their mean squared distance to the
+# centroids exceeds the fitted one by this factor, or their number exceeds
+# REPORT_CLUSTER_MAX_GROWTH times the fitted sample
+REPORT_CLUSTER_MIN_ASSIGNED = 30
+REPORT_CLUSTER_DRIFT_THRESHOLD = 1.5
+REPORT_CLUSTER_MAX_GROWTH = 1.0
+
+# Worker processes rendering batches of reports, -1 uses every core and 1
+# renders in the web process. A report taking longer than the timeout (in
+# seconds) has its worker killed, failed reports are retried this many times.
+REPORT_RENDER_WORKERS = -1
+REPORT_RENDER_TIMEOUT = 60
+REPORT_RENDER_RETRIES = 2
+
+# Generated report files are evicted once older than REPORT_MAX_AGE_DAYS since
+# their last download, then least recently downloaded first while the reports
+# folder is over REPORT_STORAGE_QUOTA bytes. The report worker sweeps every
+# REPORT_SWEEP_INTERVAL seconds, evicted reports are regenerated on download.
+REPORT_STORAGE_QUOTA = 2 * 1024 ** 3
+REPORT_MAX_AGE_DAYS = 90
+REPORT_SWEEP_INTERVAL = 60 * 60
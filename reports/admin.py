@@ -1,9 +1,24 @@
 from django.contrib import admin
-from .models import Report
+from .models import Report, ClusterAssignment, ClusterModel, ClusterRefit
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
-    list_display = ['title', 'report_type', 'generated_by', 'generated_at']
-    list_filter = ['report_type', 'generated_at']
+    list_display = ['title', 'report_type', 'status', 'cache_hit', 'generated_by', 'generated_at', 'duration']
+    list_filter = ['report_type', 'status', 'cache_hit', 'generated_at']
     search_fields = ['title']
-    readonly_fields = ['generated_at']
+    readonly_fields = ['generated_at', 'started_at', 'finished_at', 'heartbeat_at', 'error_message', 'fingerprint', 'cache_hit']
+
+@admin.register(ClusterModel)
+class ClusterModelAdmin(admin.ModelAdmin):
+    list_display = ['school', 'grade', 'gender', 'version', 'is_active', 'sample_size', 'assigned_count', 'drift', 'fitted_at']
+    list_filter = ['is_active', 'school', 'grade']
+    readonly_fields = ['centroids', 'mean', 'scale', 'sample_size', 'inertia', 'assigned_count', 'assigned_distance', 'fitted_at']
+
+@admin.register(ClusterRefit)
+class ClusterRefitAdmin(admin.ModelAdmin):
+    list_display = ['school', 'grade', 'gender', 'requested_at']
+    list_filter = ['school', 'grade']
+
+@admin.register(ClusterAssignment)
+class ClusterAssignmentAdmin(admin.ModelAdmin):
+    list_display = ['student', 'requested_at']
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        # New and edited students join the nearest group of the stored cluster
+        # models, without refitting every partition
+        from students.models import Student
+        from students.signals import students_imported
+        from . import signals
+        post_save.connect(signals.student_saved, sender=Student)
+        students_imported.connect(signals.students_imported)
@@ -0,0 +1,70 @@
+import zipfile
+
+from .documents import individual_report_filename, render_individual_report
+from .rendering import render_all
+from .stats import individual_report_data, individual_report_students
+
+# Students loaded per round of queries while streaming an archive
+BATCH_SIZE = 200
+
+
+class ZipStream:
+    """
+    Write-only file that hands back what zipfile wrote since the last call.
+
+    It is not seekable, so zipfile writes every entry's sizes after its
+    data and the archive can be sent while it is being built.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_students(students, batch_size=BATCH_SIZE):
+    """Students with their report data prefetched, batch_size at a time"""
+    ids = list(students.order_by('class_assigned', 'roll_number').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = individual_report_students(students.model.objects.filter(pk__in=ids[start:start + batch_size]))
+        yield from batch.order_by('class_assigned', 'roll_number')
+
+
+def stream_individual_reports(students, by_class=False, workers=None):
+    """
+    Yield a ZIP archive of the individual report of every student, chunk by chunk.
+
+    Report data is fetched in this process and the documents rendered on
+    the pool of reports.rendering, then written to the archive in student
+    order as they come back. Only the documents in flight and the archive's
+    central directory are held in memory. Entries are stored uncompressed,
+    .docx files being zip archives already. With by_class, reports are put
+    in one folder per class. Reports that still fail after their retries
+    are listed in errors.txt at the end of the archive.
+    """
+    stream = ZipStream()
+    errors = []
+    data = (individual_report_data(student) for student in iter_students(students))
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for report, content, error in render_all(render_individual_report, data, workers=workers):
+            name = individual_report_filename(report)
+            if by_class:
+                name = f"Grade_{report['grade']}_Section_{report['section']}/{name}"
+            if error is None:
+                archive.writestr(name, content)
+            else:
+                errors.append(f'{name}: {error}')
+            yield stream.pop()
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield stream.pop()
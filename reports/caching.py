@@ -0,0 +1,69 @@
+import json
+import os
+from hashlib import sha256
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from schools.models import Class
+from students.models import Student, StudentTestResult
+from .documents import TEMPLATE_VERSION
+from .models import Report
+
+# Lookup from a student to the target of each report type
+TARGET_LOOKUPS = {
+    'individual': 'pk',
+    'class': 'class_assigned_id',
+    'school': 'class_assigned__school_id',
+}
+
+# Lookup from a class to the target of each report type
+CLASS_LOOKUPS = {
+    'individual': 'students__pk',
+    'class': 'pk',
+    'school': 'school_id',
+}
+
+
+def report_fingerprint(report_type, target_id):
+    """
+    Hash of everything a report is generated from, three aggregate queries.
+
+    Covers the report type and target, the template version, the newest
+    update and row count of the students and test results involved, the
+    newest update of the tests they were scored on, and of the classes
+    involved and their school, whose names are in every report. Any edit,
+    addition or deletion of those rows gives a new fingerprint.
+    """
+    lookup = TARGET_LOOKUPS[report_type]
+    classes = Class.objects.filter(**{CLASS_LOOKUPS[report_type]: target_id}).aggregate(
+        latest=Max('updated_at'), count=Count('pk'), school=Max('school__updated_at')
+    )
+    students = Student.objects.filter(**{lookup: target_id}).aggregate(latest=Max('updated_at'), count=Count('pk'))
+    results = StudentTestResult.objects.filter(**{f'student__{lookup}': target_id}).aggregate(
+        latest=Max('updated_at'), count=Count('pk'), tests=Max('test__updated_at')
+    )
+    key = [report_type, int(target_id), TEMPLATE_VERSION, classes, students, results]
+    return sha256(json.dumps(key, default=str, sort_keys=True).encode()).hexdigest()
+
+
+def report_folder(fingerprint):
+    """Media folder of the files generated for a fingerprint"""
+    return f'reports/{fingerprint}'
+
+
+def cached_report(fingerprint):
+    """A finished report of the same fingerprint whose file is still on disk, or None"""
+    candidates = Report.objects.filter(fingerprint=fingerprint, status='done').exclude(file_path='')
+    for report in candidates.order_by('-finished_at')[:5]:
+        if os.path.exists(os.path.join(settings.MEDIA_ROOT, str(report.file_path))):
+            return report
+    return None
+
+
+def cache_stats():
+    """Reports served from the cache (hits) and generated (misses), one query"""
+    return Report.objects.aggregate(
+        hits=Count('pk', filter=Q(cache_hit=True)),
+        misses=Count('pk', filter=Q(cache_hit=False, status__in=['done', 'failed'])),
+    )
@@ -0,0 +1,284 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q
+from joblib import Parallel, delayed
+
+from schools.models import School
+from students.models import Student
+from students.services import update_by_value
+from .features import get_feature_matrix
+from .kmeans import fit_partition, nearest_groups
+from .models import ClusterAssignment, ClusterModel, ClusterRefit
+
+# Clustered on when a school has no test results yet
+BODY_FEATURES = ['bmi', 'height', 'weight']
+ASSIGN_CHUNK_SIZE = 5000
+
+KEY_FIELDS = {
+    'pk': 'pk',
+    'school_id': 'class_assigned__school_id',
+    'grade': 'class_assigned__grade',
+    'gender': 'gender',
+}
+
+
+def cluster_jobs():
+    """Worker processes used to fit partitions, -1 uses every core"""
+    return getattr(settings, 'REPORT_CLUSTER_JOBS', -1)
+
+
+def cluster_by_gender():
+    return getattr(settings, 'REPORT_CLUSTER_BY_GENDER', False)
+
+
+def partition_columns(by_gender=False):
+    return ['school_id', 'grade', 'gender'] if by_gender else ['school_id', 'grade']
+
+
+def load_students(students):
+    """Partition keys, body measures and current group of the given students as a DataFrame, one row per student"""
+    rows = students.filter(bmi__isnull=False).order_by().values_list(
+        *KEY_FIELDS.values(), *BODY_FEATURES, 'performance_group'
+    )
+    return pd.DataFrame(list(rows), columns=[*KEY_FIELDS, *BODY_FEATURES, 'group'])
+
+
+def school_features(school_id, df):
+    """
+    Features of the students in df, all of one school.
+
+    Returns (matrix, feature names, rank weights). Students are clustered
+    on the school's test feature matrix, with group 1 for the best overall
+    performance. Schools without test results fall back to body measures,
+    with group 1 for the lowest BMI.
+    """
+    matrix = get_feature_matrix(school_id)
+    if matrix.test_ids:
+        count = len(matrix.test_ids)
+        return matrix.rows(df['pk'].to_numpy()), matrix.names, [-1 / count] * count
+    return df[BODY_FEATURES].to_numpy(dtype=float), BODY_FEATURES, [1, 0, 0]
+
+
+def save_models(models):
+    """
+    Store fitted models as the next version of their partition.
+
+    The active models they replace are deactivated, including those of the
+    same school and grade fitted with the other gender setting.
+    """
+    latest = {
+        (row['school_id'], row['grade'], row['gender']): row['version']
+        for row in ClusterModel.objects.filter(school_id__in={model.school_id for model in models})
+        .values('school_id', 'grade', 'gender').annotate(version=Max('version'))
+    }
+    replaced = Q(pk__in=[])
+    for model in models:
+        model.version = latest.get((model.school_id, model.grade, model.gender), 0) + 1
+        same_grade = Q(school_id=model.school_id, grade=model.grade)
+        replaced |= same_grade if not model.gender else same_grade & Q(gender__in=['', model.gender])
+    ClusterModel.objects.filter(replaced, is_active=True).update(is_active=False)
+    ClusterModel.objects.bulk_create(models)
+
+
+def fit_partitions(df, features, names, rank_weights, by_gender, parallel):
+    """
+    Fit every partition of df on the pool, save the models and the groups.
+
+    features holds the feature rows of df, in the same order. Returns the
+    number of students grouped.
+    """
+    partitions = df.groupby(partition_columns(by_gender), sort=False).indices
+    fits = parallel(delayed(fit_partition)(features[positions], rank_weights) for positions in partitions.values())
+
+    groups = np.empty(len(df), dtype=int)
+    models = []
+    for key, positions, fit in zip(partitions, partitions.values(), fits):
+        groups[positions] = fit['groups']
+        models.append(ClusterModel(
+            school_id=key[0],
+            grade=key[1],
+            gender=key[2] if by_gender else '',
+            features=names,
+            centroids=fit['centroids'],
+            mean=fit['mean'],
+            scale=fit['scale'],
+            sample_size=len(positions),
+            inertia=fit['inertia'],
+        ))
+
+    with transaction.atomic():
+        save_models(models)
+        update_by_value(Student, 'performance_group', df['pk'].to_numpy(), groups)
+    return len(df)
+
+
+def cluster_students(school=None, by_gender=None, n_jobs=None):
+    """
+    Refit the performance groups of every school x grade partition.
+
+    Schools are processed one at a time so memory is bounded by the largest
+    school. The partitions of a school are fitted concurrently on a joblib
+    process pool, reused across schools, then saved as new model versions
+    and the groups of the whole school written in bulk. Pass a school to
+    refit only that school. Returns the number of students grouped.
+    """
+    by_gender = cluster_by_gender() if by_gender is None else by_gender
+    schools = [school.pk] if school else list(School.objects.values_list('pk', flat=True))
+    clustered = 0
+
+    with Parallel(n_jobs=n_jobs or cluster_jobs()) as parallel:
+        for school_id in schools:
+            df = load_students(Student.objects.filter(class_assigned__school_id=school_id))
+            if not df.empty:
+                clustered += fit_partitions(df, *school_features(school_id, df), by_gender, parallel)
+
+    ClusterRefit.objects.filter(school_id__in=schools).delete()
+    return clustered
+
+
+def refit_partitions(keys):
+    """
+    Refit single (school, grade, gender) partitions in process.
+
+    An empty gender refits the school's grade with both genders together.
+    """
+    parallel = Parallel(n_jobs=1)
+    for school_id in {key[0] for key in keys}:
+        df = load_students(Student.objects.filter(class_assigned__school_id=school_id))
+        features, names, rank_weights = school_features(school_id, df)
+        for _, grade, gender in [key for key in keys if key[0] == school_id]:
+            mask = ((df['grade'] == grade) & ((df['gender'] == gender) if gender else True)).to_numpy()
+            if mask.any():
+                fit_partitions(df[mask], features[mask], names, rank_weights, bool(gender), parallel)
+
+
+def queue_refits(keys):
+    """Queue (school, grade, gender) partitions for run_queued_refits()"""
+    ClusterRefit.objects.bulk_create(
+        [ClusterRefit(school_id=school_id, grade=grade, gender=gender) for school_id, grade, gender in keys],
+        ignore_conflicts=True,
+    )
+
+
+def queue_school_refits(school=None, by_gender=None):
+    """Queue every grade partition of a school, or of all schools, returns how many were queued"""
+    by_gender = cluster_by_gender() if by_gender is None else by_gender
+    students = Student.objects.filter(bmi__isnull=False)
+    if school:
+        students = students.filter(class_assigned__school=school)
+    keys = {
+        (school_id, grade, gender if by_gender else '')
+        for school_id, grade, gender in students.order_by().values_list(
+            'class_assigned__school_id', 'class_assigned__grade', 'gender'
+        ).distinct()
+    }
+    queue_refits(keys)
+    return len(keys)
+
+
+def queue_assignments(student_ids):
+    """Queue students for run_queued_assignments()"""
+    ClusterAssignment.objects.bulk_create(
+        [ClusterAssignment(student_id=student_id) for student_id in student_ids], ignore_conflicts=True
+    )
+
+
+def run_queued_assignments():
+    """Assign the students queued by queue_assignments(), returns how many were queued"""
+    queued = list(ClusterAssignment.objects.values_list('pk', 'student_id'))
+    if not queued:
+        return 0
+    ClusterAssignment.objects.filter(pk__in=[row[0] for row in queued]).delete()
+    assign_students([row[1] for row in queued], refit=False)
+    return len(queued)
+
+
+def run_queued_refits():
+    """Fit the partitions queued by queue_refits(), returns how many were fitted"""
+    queued = list(ClusterRefit.objects.values_list('pk', 'school_id', 'grade', 'gender'))
+    if not queued:
+        return 0
+    # Removed first, a partition queued again while fitting is fitted next time
+    ClusterRefit.objects.filter(pk__in=[row[0] for row in queued]).delete()
+    refit_partitions({row[1:] for row in queued})
+    return len(queued)
+
+
+def is_drifted(model):
+    """
+    Whether a model no longer fits the students assigned since it was fitted.
+
+    Either they sit much further from their centroids than the fitted
+    students did, or the partition has grown well past its fitted size.
+    """
+    if model.assigned_count < getattr(settings, 'REPORT_CLUSTER_MIN_ASSIGNED', 30):
+        return False
+    if model.drift is not None and model.drift > getattr(settings, 'REPORT_CLUSTER_DRIFT_THRESHOLD', 1.5):
+        return True
+    return model.assigned_count > model.sample_size * getattr(settings, 'REPORT_CLUSTER_MAX_GROWTH', 1.0)
+
+
+def assign_students(student_ids, refit=True):
+    """
+    Put students in the group of the nearest centroid of their partition.
+
+    Used for new and changed students, vectorized over batches of
+    ASSIGN_CHUNK_SIZE. Only students without a group yet count towards a
+    model's assigned_count and drift, so saving a student again does not
+    make the model look outgrown. Partitions without an active model are fitted, and
+    models that drift past the thresholds are refitted, once every batch
+    is assigned. With refit=False they are queued for the report worker
+    instead, see run_queued_refits(). Returns the number of students
+    assigned.
+    """
+    student_ids = list(student_ids)
+    to_refit = set()
+    assigned = 0
+    for start in range(0, len(student_ids), ASSIGN_CHUNK_SIZE):
+        assigned += _assign_chunk(student_ids[start:start + ASSIGN_CHUNK_SIZE], to_refit)
+    if to_refit and refit:
+        refit_partitions(to_refit)
+    elif to_refit:
+        queue_refits(to_refit)
+    return assigned
+
+
+def _assign_chunk(student_ids, to_refit):
+    df = load_students(Student.objects.filter(pk__in=student_ids))
+    if df.empty:
+        return 0
+
+    models = {
+        (model.school_id, model.grade, model.gender): model
+        for model in ClusterModel.objects.filter(school_id__in=df['school_id'].unique().tolist(), is_active=True)
+    }
+    groups = np.zeros(len(df), dtype=int)
+    ungrouped = df['group'].isna().to_numpy()
+    for school_id, school_positions in df.groupby('school_id', sort=False).indices.items():
+        school = df.iloc[school_positions]
+        features, names, _ = school_features(school_id, school)
+        for (grade, gender), positions in school.groupby(['grade', 'gender'], sort=False).indices.items():
+            model = models.get((school_id, grade, gender)) or models.get((school_id, grade, ''))
+            if model is None or model.features != names:
+                # No model yet, or fitted before the school's tests changed
+                to_refit.add((school_id, grade, gender if cluster_by_gender() else ''))
+                continue
+            partition_groups, distances = nearest_groups(features[positions], model.mean, model.scale, model.centroids)
+            groups[school_positions[positions]] = partition_groups
+            first = ungrouped[school_positions[positions]]
+            if not first.any():
+                continue
+            model.assigned_count += int(first.sum())
+            model.assigned_distance += float(distances[first].sum())
+            ClusterModel.objects.filter(pk=model.pk).update(
+                assigned_count=F('assigned_count') + int(first.sum()),
+                assigned_distance=F('assigned_distance') + float(distances[first].sum()),
+            )
+            if is_drifted(model):
+                to_refit.add((model.school_id, model.grade, model.gender))
+
+    assigned = groups > 0
+    update_by_value(Student, 'performance_group', df['pk'].to_numpy()[assigned], groups[assigned])
+    return int(assigned.sum())
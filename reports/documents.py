@@ -0,0 +1,245 @@
+# Report documents are laid out from the plain dicts built by reports.stats,
+# never from querysets: the render pool lays them out in processes that
+# have no database connection.
+from copy import deepcopy
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.shared import OxmlElement, qn
+
+# Part of every report's cache fingerprint, bump it whenever a layout changes
+# so that reports cached with the previous one are generated again
+TEMPLATE_VERSION = 2
+
+@lru_cache(maxsize=None)
+def document_skeleton():
+    """The blank report document, saved once per process"""
+    buffer = BytesIO()
+    Document().save(buffer)
+    return buffer.getvalue()
+
+def new_document():
+    """A fresh document cloned from the cached skeleton"""
+    return Document(BytesIO(document_skeleton()))
+
+@lru_cache(maxsize=None)
+def table_borders():
+    tblBorders = OxmlElement('w:tblBorders')
+
+    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
+        border = OxmlElement(f'w:{border_name}')
+        border.set(qn('w:val'), 'single')
+        border.set(qn('w:sz'), '4')
+        border.set(qn('w:space'), '0')
+        border.set(qn('w:color'), '000000')
+        tblBorders.append(border)
+
+    return tblBorders
+
+def create_table_border(table):
+    """Add borders to table"""
+    table._tbl.tblPr.append(deepcopy(table_borders()))
+
+@lru_cache(maxsize=None)
+def grid_table_properties():
+    """Table properties of a bordered 'Table Grid' table, built once per process"""
+    table = new_document().add_table(rows=0, cols=1)
+    table.style = 'Table Grid'
+    create_table_border(table)
+    return table._tbl.tblPr
+
+def add_heading(doc, text, level=1):
+    """
+    Same paragraph as doc.add_heading(), with the style id set directly.
+
+    python-docx resolves style names by scanning every style of the
+    document on each call, a good part of the time spent on a short report.
+    """
+    paragraph = doc.add_paragraph(text)
+    paragraph._p.style = 'Title' if level == 0 else f'Heading{level}'
+    return paragraph
+
+def grid_table(doc, rows, cols):
+    """Empty bordered 'Table Grid' table, its properties cloned from grid_table_properties()"""
+    table = doc.add_table(rows=rows, cols=cols)
+    table._tbl.replace(table._tbl.tblPr, deepcopy(grid_table_properties()))
+    return table
+
+def add_grid_table(doc, headers, rows, bold_headers=True):
+    """
+    Append a bordered 'Table Grid' table of a header row and rows of strings.
+
+    Table properties are cloned from grid_table_properties() and every data
+    row from an empty row, then filled at the XML level: python-docx
+    rebuilds every row object on each table.rows[i], which makes filling
+    cells through it quadratic in the number of rows. The XML is the same
+    as setting cell.text on every cell.
+    """
+    table = grid_table(doc, 1, len(headers))
+    tbl = table._tbl
+    empty_row = deepcopy(tbl.tr_lst[0])
+
+    for cell, header in zip(table.rows[0].cells, headers):
+        cell.text = header
+        if bold_headers:
+            cell.paragraphs[0].runs[0].font.bold = True
+
+    for values in rows:
+        tr = deepcopy(empty_row)
+        for tc, value in zip(tr.tc_lst, values):
+            tc.p_lst[0].add_r().text = value
+        tbl.append(tr)
+    return table
+
+def individual_report_filename(data):
+    return f"report_{data['name'].replace(' ', '_')}_{data['roll_number']}.docx"
+
+def write_individual_report(data):
+    """Build the individual report document from individual_report_data()"""
+    doc = new_document()
+
+    # Header
+    header = doc.sections[0].header
+    header_para = header.paragraphs[0]
+    header_para.text = f"{data['school']} - Physical Assessment Report"
+    header_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Title
+    title = add_heading(doc, 'PHYSICAL ASSESSMENT REPORT', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Student Information
+    add_heading(doc, 'Student Information', level=1)
+
+    # Create student info table
+    info_table = grid_table(doc, 8, 2)
+
+    # Fill student information
+    info_data = [
+        ('Name', data['name']),
+        ('Roll Number', data['roll_number']),
+        ('Class', f"Grade {data['grade']} Section {data['section']}"),
+        ('Date of Birth', data['date_of_birth'].strftime('%Y-%m-%d')),
+        ('Age', f"{data['age']} years"),
+        ('Gender', data['gender']),
+        ('Height', f"{data['height']} inches"),
+        ('Weight', f"{data['weight']} kg"),
+    ]
+
+    for row, (label, value) in zip(info_table.rows, info_data):
+        row.cells[0].text = label
+        row.cells[1].text = str(value)
+        row.cells[0].paragraphs[0].runs[0].font.bold = True
+
+    # BMI Analysis
+    add_heading(doc, 'BMI Analysis', level=1)
+    bmi_para = doc.add_paragraph()
+    bmi_para.add_run(f"BMI: {data['bmi']}").bold = True
+    bmi_para.add_run(f" - Category: {data['bmi_category']}")
+
+    # Physical Test Results
+    test_results = data['test_results']
+    if test_results:
+        add_heading(doc, 'Physical Test Results', level=1)
+
+        headers = ['Test Name', 'Score', 'Unit', 'Comment']
+        add_grid_table(doc, headers, (
+            [result['test'], str(result['score']), result['unit'], result['comment'] or 'N/A']
+            for result in test_results
+        ))
+
+    # Overall Comment
+    if data['overall_comment']:
+        add_heading(doc, 'Overall Assessment', level=1)
+        doc.add_paragraph(data['overall_comment'])
+
+    return doc
+
+def write_class_report(data):
+    """Build the class report document from class_report_data()"""
+    doc = new_document()
+
+    # Title
+    title = add_heading(doc, f"CLASS REPORT - Grade {data['grade']} Section {data['section']}", 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # School info
+    doc.add_paragraph(f"School: {data['school']}")
+    doc.add_paragraph(f"Total Students: {data['total_students']}")
+    # Served from the cache until the data changes, so the time of
+    # rendering is a time the data is known to match, not the download's
+    doc.add_paragraph(f"Data As Of: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+    # Class Summary Table
+    add_heading(doc, 'Class Summary', level=1)
+
+    headers = ['Roll', 'Name', 'Age', 'Gender', 'Height', 'Weight', 'BMI', 'BMI Category']
+    add_grid_table(doc, headers, (
+        [
+            student['roll_number'],
+            student['name'],
+            str(student['age']),
+            student['gender'],
+            f"{student['height']}\"",
+            f"{student['weight']}kg",
+            str(student['bmi']),
+            student['bmi_category'] or ''
+        ]
+        for student in data['students']
+    ))
+
+    # BMI Distribution
+    add_heading(doc, 'BMI Distribution', level=1)
+    for category in data['bmi_distribution']:
+        doc.add_paragraph(f"{category['label']}: {category['count']} students")
+
+    return doc
+
+def write_school_report(data):
+    """Build the school report document from school_report_data()"""
+    doc = new_document()
+
+    # Title
+    title = add_heading(doc, f'SCHOOL PHYSICAL ASSESSMENT REPORT', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # School info
+    doc.add_paragraph(f"School: {data['name']}")
+    doc.add_paragraph(f"Address: {data['address']}")
+    doc.add_paragraph(f"Total Students: {data['total_students']}")
+    doc.add_paragraph(f"Data As Of: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+    # Overall Statistics
+    add_heading(doc, 'Overall Statistics', level=1)
+
+    # BMI Distribution
+    add_grid_table(doc, ["BMI Category", "Count", "Percentage"], (
+        [row['label'], str(row['count']), f"{row['percentage']:.1f}%"]
+        for row in data['bmi_distribution']
+    ), bold_headers=False)
+
+    # Class-wise breakdown
+    add_heading(doc, 'Class-wise Breakdown', level=1)
+
+    class_headers = ['Class', 'Total Students', 'Avg BMI', 'Healthy %', 'At Risk %']
+    add_grid_table(doc, class_headers, (
+        [
+            row['label'],
+            str(row['total']),
+            f"{row['avg_bmi']:.1f}",
+            f"{row['healthy_percentage']:.1f}%",
+            f"{row['at_risk_percentage']:.1f}%",
+        ]
+        for row in data['classes']
+    ))
+
+    return doc
+
+def render_individual_report(data):
+    """The individual report of individual_report_data() as .docx bytes"""
+    buffer = BytesIO()
+    write_individual_report(data).save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,81 @@
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from students.models import StudentTestResult
+
+# Rebuilt anyway as soon as a result of the school changes, see feature_cache_key()
+FEATURE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class FeatureMatrix:
+    """
+    Standardized student x test matrix of one school's latest scores.
+
+    Columns are oriented so that higher is better, centred on the column
+    mean and divided by its standard deviation. Missing scores are imputed
+    with the column mean, i.e. 0 once standardized, and so are students
+    without any result.
+    """
+
+    def __init__(self, student_ids, test_ids, values):
+        self.student_ids = student_ids
+        self.test_ids = test_ids
+        self.values = values
+
+    @property
+    def names(self):
+        return [f'test_{test_id}' for test_id in self.test_ids]
+
+    def rows(self, student_ids):
+        """Feature rows of the given students, in that order"""
+        student_ids = np.asarray(student_ids)
+        positions = np.searchsorted(self.student_ids, student_ids)
+        positions = np.minimum(positions, max(len(self.student_ids) - 1, 0))
+        found = (self.student_ids[positions] == student_ids) if len(self.student_ids) else np.zeros(len(student_ids), bool)
+        rows = np.zeros((len(student_ids), len(self.test_ids)))
+        rows[found] = self.values[positions[found]]
+        return rows
+
+
+def build_feature_matrix(school_id):
+    """Pivot the latest score of every student and test of a school, from a single query"""
+    rows = list(
+        StudentTestResult.objects.latest_scores()
+        .filter(student__class_assigned__school_id=school_id)
+        .values_list('student_id', 'test_id', 'score', 'test__lower_is_better')
+    )
+    if not rows:
+        return FeatureMatrix(np.array([], dtype=np.int64), [], np.empty((0, 0)))
+
+    data = np.array(rows, dtype=float)
+    student_ids, student_index = np.unique(data[:, 0].astype(np.int64), return_inverse=True)
+    test_ids, test_index = np.unique(data[:, 1].astype(np.int64), return_inverse=True)
+    scores = np.where(data[:, 3] == 1, -data[:, 2], data[:, 2])
+
+    values = np.full((len(student_ids), len(test_ids)), np.nan)
+    values[student_index, test_index] = scores
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[std == 0] = 1
+    values = np.nan_to_num((values - mean) / std)
+    return FeatureMatrix(student_ids, test_ids.tolist(), values)
+
+
+def feature_cache_key(school_id):
+    """Cache key that changes with the school's newest result, and with deletions"""
+    stamp = StudentTestResult.objects.filter(student__class_assigned__school_id=school_id).aggregate(
+        latest=Max('updated_at'), count=Count('pk')
+    )
+    latest = stamp['latest'].timestamp() if stamp['latest'] else 0
+    return f'reports:features:{school_id}:{latest}:{stamp["count"]}'
+
+
+def get_feature_matrix(school_id):
+    """The school's feature matrix, built once per change of its results"""
+    key = feature_cache_key(school_id)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_feature_matrix(school_id)
+        cache.set(key, matrix, FEATURE_CACHE_TIMEOUT)
+    return matrix
@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from students.services import keep_alive
+from .caching import cached_report, report_fingerprint, report_folder
+from .models import Report
+from .utils import generate_class_report, generate_individual_report, generate_school_report
+
+# A running report without a heartbeat for this long is considered abandoned
+# by a dead worker and is put back on the queue
+STALE_AFTER = timedelta(minutes=5)
+
+# Seconds between heartbeats of a rendering report, well within STALE_AFTER
+HEARTBEAT_INTERVAL = 60
+
+GENERATORS = {
+    'individual': generate_individual_report,
+    'class': generate_class_report,
+    'school': generate_school_report,
+}
+
+
+def enqueue_report(report_type, target_id, title, user):
+    """
+    Record a report to be generated by the report worker.
+
+    When a report was already generated from identical data, the new one
+    is done at once and shares its file.
+    """
+    fingerprint = report_fingerprint(report_type, target_id)
+    report = Report(
+        title=title,
+        report_type=report_type,
+        target_id=target_id,
+        generated_by=user,
+        fingerprint=fingerprint,
+    )
+    cached = cached_report(fingerprint)
+    if cached is not None:
+        report.status = 'done'
+        report.cache_hit = True
+        report.file_path = cached.file_path
+        report.started_at = report.finished_at = timezone.now()
+    report.save()
+    return report
+
+
+def requeue_report(report):
+    """Queue a finished report to be generated again, e.g. after its file was evicted"""
+    return Report.objects.filter(pk=report.pk, status__in=['done', 'failed']).update(
+        status='queued', cache_hit=False, error_message='', started_at=None, finished_at=None, updated_at=timezone.now()
+    )
+
+
+def requeue_stale_reports(stale_after=STALE_AFTER):
+    """Put reports abandoned by a crashed or restarted worker back on the queue"""
+    cutoff = timezone.now() - stale_after
+    silent = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, updated_at__lt=cutoff)
+    return Report.objects.filter(silent, status='running').update(status='queued')
+
+
+def heartbeat(report):
+    """Mark a rendering report as alive"""
+    Report.objects.filter(pk=report.pk, status='running').update(heartbeat_at=timezone.now())
+
+
+def claim_next_report():
+    """
+    Atomically move the oldest queued report to running, returns None if the queue is empty.
+
+    Reports with the same fingerprint as a running one are left queued:
+    they are completed with its file when it finishes. Two workers claiming
+    reports of the same fingerprint at once are kept apart by the
+    unique_running_fingerprint constraint.
+    """
+    while True:
+        rendering = Report.objects.filter(status='running').exclude(fingerprint='').values('fingerprint')
+        report = Report.objects.filter(status='queued').exclude(fingerprint__in=rendering).order_by('generated_at').first()
+        if report is None:
+            return None
+        try:
+            with transaction.atomic():
+                claimed = Report.objects.filter(pk=report.pk, status='queued').update(
+                    status='running',
+                    started_at=timezone.now(),
+                    updated_at=timezone.now(),
+                    heartbeat_at=timezone.now(),
+                )
+        except IntegrityError:
+            # Another worker just started rendering the same data
+            continue
+        if claimed:
+            report.refresh_from_db()
+            return report
+
+
+def finish_report(report, status, error_message='', **fields):
+    Report.objects.filter(pk=report.pk).update(
+        status=status, error_message=error_message, finished_at=timezone.now(), updated_at=timezone.now(), **fields
+    )
+    report.refresh_from_db()
+    return report
+
+
+def complete_waiting_reports(report, fingerprints):
+    """Finish the queued reports of the given fingerprints with the file of a done report"""
+    now = timezone.now()
+    return Report.objects.filter(status='queued', fingerprint__in=fingerprints).update(
+        status='done',
+        cache_hit=True,
+        file_path=report.file_path.name,
+        started_at=now,
+        finished_at=now,
+        updated_at=now,
+    )
+
+
+def run_report(report):
+    """
+    Generate a claimed report and record its file, or why it failed.
+
+    The fingerprint is taken again as the data may have changed since the
+    report was queued. Files are written to a folder named after it, so
+    reports of different targets or data never overwrite each other.
+    Identical reports queued meanwhile get the same file without rendering.
+    A background heartbeat keeps the report from being requeued while it
+    renders, however long that takes.
+    """
+    with keep_alive(lambda: heartbeat(report), HEARTBEAT_INTERVAL):
+        return _run_report(report)
+
+
+def _run_report(report):
+    queued_fingerprint = report.fingerprint
+    try:
+        fingerprint = report_fingerprint(report.report_type, report.target_id)
+        cached = cached_report(fingerprint)
+        if cached is not None:
+            report = finish_report(report, 'done', file_path=cached.file_path.name, fingerprint=fingerprint, cache_hit=True)
+        else:
+            folder = report_folder(fingerprint)
+            file_path, filename = GENERATORS[report.report_type](report.target_id, folder=folder)
+            report = finish_report(report, 'done', file_path=f'{folder}/{filename}', fingerprint=fingerprint)
+    except Exception as e:
+        return finish_report(report, 'failed', str(e))
+    complete_waiting_reports(report, {queued_fingerprint, fingerprint} - {''})
+    return report
@@ -0,0 +1,54 @@
+# Numeric core of the clustering: partitions come in as numpy arrays and
+# labels go back the same way, so joblib can fit them in plain worker
+# processes. reports.clustering does the loading and saving.
+import numpy as np
+
+CLUSTER_COUNT = 3
+# Partitions larger than this are fitted with MiniBatchKMeans
+MINIBATCH_THRESHOLD = 50000
+
+
+def fit_partition(features, rank_weights, n_clusters=CLUSTER_COUNT):
+    """
+    Cluster the standardized features of one partition.
+
+    Runs in a worker process on plain arrays. Centroids are ordered by
+    their dot product with rank_weights and groups are numbered from 1 in
+    that order, so group numbers mean the same thing in every partition.
+    Returns the group of every row along with the fitted model as plain
+    lists: centroids, mean, scale and the mean squared distance (inertia).
+    """
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1
+    scaled = (features - mean) / scale
+
+    n_clusters = min(n_clusters, len(features))
+    if n_clusters < 2:
+        centroids = scaled.mean(axis=0, keepdims=True)
+    else:
+        if len(features) > MINIBATCH_THRESHOLD:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        kmeans.fit(scaled)
+        centroids = kmeans.cluster_centers_[np.argsort(kmeans.cluster_centers_ @ np.asarray(rank_weights))]
+
+    groups, distances = nearest_groups(features, mean, scale, centroids)
+    return {
+        'groups': groups,
+        'centroids': centroids.tolist(),
+        'mean': mean.tolist(),
+        'scale': scale.tolist(),
+        'inertia': float(distances.mean()),
+    }
+
+
+def nearest_groups(features, mean, scale, centroids):
+    """Group (1-based) of the nearest centroid for every row, with its squared distance"""
+    scaled = (features - np.asarray(mean)) / np.asarray(scale)
+    distances = ((scaled[:, None, :] - np.asarray(centroids)[None, :, :]) ** 2).sum(axis=2)
+    nearest = distances.argmin(axis=1)
+    return nearest + 1, distances[np.arange(len(features)), nearest]
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.clustering import cluster_students
+from schools.models import School
+
+
+class Command(BaseCommand):
+    help = 'Refit the performance groups of every school and grade, saving new cluster model versions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only re-cluster this school id')
+        parser.add_argument('--by-gender', action='store_true', default=None,
+                            help='Also split partitions by gender, defaults to REPORT_CLUSTER_BY_GENDER')
+        parser.add_argument('--jobs', type=int, help='Worker processes, defaults to REPORT_CLUSTER_JOBS')
+
+    def handle(self, *args, **options):
+        school = None
+        if options['school']:
+            try:
+                school = School.objects.get(pk=options['school'])
+            except School.DoesNotExist:
+                raise CommandError(f'School {options["school"]} does not exist')
+
+        started = time.monotonic()
+        clustered = cluster_students(school, by_gender=options['by_gender'], n_jobs=options['jobs'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Grouped {clustered} students in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports.clustering import run_queued_assignments, run_queued_refits
+from reports.jobs import claim_next_report, requeue_stale_reports, run_report
+from reports.retention import sweep_interval, sweep_report_files
+
+
+class Command(BaseCommand):
+    help = 'Generate queued reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Report worker started')
+        last_sweep = None
+        while True:
+            if last_sweep is None or time.monotonic() - last_sweep > sweep_interval():
+                swept = sweep_report_files()
+                last_sweep = time.monotonic()
+                if swept['files_removed']:
+                    self.stdout.write(f'Evicted {swept["files_removed"]} report file(s)')
+
+            requeued = requeue_stale_reports()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale report(s)')
+
+            report = claim_next_report()
+            if report is None:
+                # Saved students are grouped, and the cluster partitions
+                # queued meanwhile fitted, while no report is waiting
+                assigned = run_queued_assignments()
+                if assigned:
+                    self.stdout.write(f'Grouped {assigned} saved student(s)')
+                refitted = run_queued_refits()
+                if refitted:
+                    self.stdout.write(f'Fitted {refitted} queued cluster partition(s)')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Generating report #{report.pk}: {report.title}')
+            report = run_report(report)
+            if report.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f'Report #{report.pk} done in {report.duration:.1f}s'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Report #{report.pk} failed: {report.error_message}'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from reports.retention import sweep_report_files
+
+
+class Command(BaseCommand):
+    help = 'Evict old and least recently downloaded report files to keep the reports folder within its quota'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quota', type=int, help='Bytes the reports folder may use, defaults to REPORT_STORAGE_QUOTA')
+        parser.add_argument('--max-age-days', type=int, help='Evict files unused for longer, defaults to REPORT_MAX_AGE_DAYS')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+
+    def handle(self, *args, **options):
+        age = timedelta(days=options['max_age_days']) if options['max_age_days'] is not None else None
+        result = sweep_report_files(quota=options['quota'], age=age, dry_run=options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result["files_removed"]} file(s), {result["bytes_freed"] / 1024 ** 2:.1f} MB freed, '
+            f'{result["bytes_used"] / 1024 ** 2:.1f} MB in use'
+        ))
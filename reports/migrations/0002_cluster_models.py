@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('schools', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(max_length=10)),
+                ('gender', models.CharField(blank=True, help_text='Empty when genders are clustered together', max_length=1)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('is_active', models.BooleanField(default=True)),
+                ('features', models.JSONField()),
+                ('centroids', models.JSONField()),
+                ('mean', models.JSONField()),
+                ('scale', models.JSONField()),
+                ('sample_size', models.IntegerField()),
+                ('inertia', models.FloatField()),
+                ('assigned_count', models.IntegerField(default=0)),
+                ('assigned_distance', models.FloatField(default=0)),
+                ('fitted_at', models.DateTimeField(auto_now_add=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cluster_models', to='schools.school')),
+            ],
+            options={
+                'ordering': ['school', 'grade', 'gender', '-version'],
+                'indexes': [models.Index(fields=['school', 'is_active'], name='reports_clu_school__47eb6e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('school', 'grade', 'gender', 'version'), name='unique_cluster_model_version')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_report_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='cache_hit',
+            field=models.BooleanField(default=False, help_text='Served a file generated for an earlier report'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_report_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='report',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running'), models.Q(('fingerprint', ''), _negated=True)), fields=('fingerprint',), name='unique_running_fingerprint'),
+        ),
+    ]
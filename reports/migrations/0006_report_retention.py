@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_single_flight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='last_downloaded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
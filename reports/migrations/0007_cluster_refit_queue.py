@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_report_retention'),
+        ('schools', '0002_class_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterRefit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(max_length=10)),
+                ('gender', models.CharField(blank=True, help_text='Empty when genders are clustered together', max_length=1)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cluster_refits', to='schools.school')),
+            ],
+            options={
+                'ordering': ['requested_at'],
+                'constraints': [models.UniqueConstraint(fields=('school', 'grade', 'gender'), name='unique_cluster_refit')],
+            },
+        ),
+    ]
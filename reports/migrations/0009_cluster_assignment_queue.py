@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_report_heartbeat'),
+        ('students', '0012_physicaltest_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cluster_assignment', to='students.student')),
+            ],
+            options={
+                'ordering': ['requested_at'],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from students.models import Student
 
 class Report(models.Model):
@@ -8,14 +9,140 @@ class Report(models.Model):
         ('school', 'School Report'),
     ]
 
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
     title = models.CharField(max_length=200)
     report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
+    # Student, class or school the report is about, depending on report_type
+    target_id = models.PositiveIntegerField(blank=True, null=True)
     generated_by = models.ForeignKey('auth.User', on_delete=models.CASCADE)
     generated_at = models.DateTimeField(auto_now_add=True)
     file_path = models.FileField(upload_to='reports/', blank=True)
 
+    # Generation lifecycle, reports are built by the report worker
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    error_message = models.TextField(blank=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Refreshed by the worker while it renders, see reports.jobs.requeue_stale_reports
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    # Hash of the data the file was generated from, see reports.caching
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+    cache_hit = models.BooleanField(default=False, help_text="Served a file generated for an earlier report")
+    # Least recently downloaded files are evicted first, see reports.retention
+    last_downloaded_at = models.DateTimeField(blank=True, null=True)
+
     class Meta:
         ordering = ['-generated_at']
+        indexes = [models.Index(fields=['status', 'generated_at'])]
+        constraints = [
+            # At most one report of the same data renders at a time, across
+            # every worker process, see reports.jobs.claim_next_report
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=models.Q(status='running') & ~models.Q(fingerprint=''),
+                name='unique_running_fingerprint',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.generated_at.strftime('%Y-%m-%d')}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    @property
+    def duration(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+class ClusterModel(models.Model):
+    """
+    Fitted performance groups of one school x grade (x gender) partition.
+
+    Centroids are stored in standardized feature space, ordered by group,
+    with the mean and scale used to standardize. Every refit adds a new
+    version and deactivates the previous one. assigned_count and
+    assigned_distance track students assigned since the fit, to detect drift.
+    """
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, related_name='cluster_models')
+    grade = models.CharField(max_length=10)
+    gender = models.CharField(max_length=1, blank=True, help_text="Empty when genders are clustered together")
+    version = models.PositiveIntegerField(default=1)
+    is_active = models.BooleanField(default=True)
+
+    features = models.JSONField()
+    centroids = models.JSONField()
+    mean = models.JSONField()
+    scale = models.JSONField()
+    sample_size = models.IntegerField()
+    # Mean squared distance of the fitted students to their centroid
+    inertia = models.FloatField()
+
+    assigned_count = models.IntegerField(default=0)
+    assigned_distance = models.FloatField(default=0)
+    fitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['school', 'grade', 'gender', '-version']
+        constraints = [
+            models.UniqueConstraint(fields=['school', 'grade', 'gender', 'version'], name='unique_cluster_model_version'),
+        ]
+        indexes = [models.Index(fields=['school', 'is_active'])]
+
+    def __str__(self):
+        gender = f" {self.gender}" if self.gender else ""
+        return f"{self.school.name} - Grade {self.grade}{gender} v{self.version}"
+
+    @property
+    def drift(self):
+        """Mean squared distance of newly assigned students relative to the fit, 1.0 means no drift"""
+        if not self.assigned_count or not self.inertia:
+            return None
+        return self.assigned_distance / self.assigned_count / self.inertia
+
+
+class ClusterRefit(models.Model):
+    """
+    A partition waiting to be fitted by the report worker.
+
+    Imports and queued assignments only assign students to existing cluster
+    models, the partitions without one or whose model drifted are queued
+    here instead of being fitted while an import job waits.
+    """
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, related_name='cluster_refits')
+    grade = models.CharField(max_length=10)
+    gender = models.CharField(max_length=1, blank=True, help_text="Empty when genders are clustered together")
+    requested_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['requested_at']
+        constraints = [
+            models.UniqueConstraint(fields=['school', 'grade', 'gender'], name='unique_cluster_refit'),
+        ]
+
+    def __str__(self):
+        gender = f" {self.gender}" if self.gender else ""
+        return f"{self.school.name} - Grade {self.grade}{gender} refit"
+
+
+class ClusterAssignment(models.Model):
+    """A saved student waiting to be put in a performance group by the report worker"""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='cluster_assignment')
+    requested_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['requested_at']
+
+    def __str__(self):
+        return f"{self.student} assignment"
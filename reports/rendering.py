@@ -0,0 +1,120 @@
+import os
+from collections import deque
+from concurrent.futures import TimeoutError
+
+from django.conf import settings
+from joblib.externals.loky import get_reusable_executor
+from joblib.externals.loky.process_executor import BrokenProcessPool, ShutdownExecutorError
+
+
+def render_workers():
+    """Rendering processes, -1 uses every core and 1 renders in process"""
+    workers = getattr(settings, 'REPORT_RENDER_WORKERS', -1)
+    return (os.cpu_count() or 1) if workers == -1 else workers
+
+
+def render_timeout():
+    return getattr(settings, 'REPORT_RENDER_TIMEOUT', 60)
+
+
+def render_retries():
+    return getattr(settings, 'REPORT_RENDER_RETRIES', 2)
+
+
+def render_all(render, items, workers=None, timeout=None, retries=None):
+    """
+    Call render on every item on a pool of worker processes.
+
+    render must be importable without Django (see reports.documents) and
+    items must be plain data, they are pickled to the workers. Yields
+    (item, result, error) in the order of items, error being None on
+    success. At most two tasks per worker are in flight, so items may be a
+    generator fetching data as rendering goes.
+
+    A task failing is retried up to `retries` times. A task still running
+    `timeout` seconds after it is next in line has its workers killed, then
+    is retried like a failure while the other tasks in flight are
+    resubmitted as they were.
+
+    Every call of a process shares one pool of `workers` processes, so
+    concurrent downloads never start more than that. When the pool is
+    killed for another call's stuck task, the tasks lost with it are
+    resubmitted to its replacement.
+    """
+    workers = render_workers() if workers is None else workers
+    timeout = render_timeout() if timeout is None else timeout
+    retries = render_retries() if retries is None else retries
+
+    if workers <= 1:
+        for item in items:
+            yield (item, *_render_in_process(render, item, retries))
+        return
+
+    items = iter(items)
+    pending = deque()
+
+    def submit(task):
+        try:
+            task['future'] = render_pool(workers).submit(render, task['item'])
+        except (BrokenProcessPool, ShutdownExecutorError):
+            # Killed by another call meanwhile, a fresh pool takes over
+            task['future'] = render_pool(workers).submit(render, task['item'])
+
+    try:
+        while True:
+            while len(pending) < workers * 2:
+                item = next(items, None)
+                if item is None:
+                    break
+                task = {'item': item, 'attempts': 0}
+                submit(task)
+                pending.append(task)
+            if not pending:
+                return
+
+            task = pending[0]
+            try:
+                result, error = task['future'].result(timeout=timeout), None
+            except TimeoutError:
+                result, error = None, f'Timed out after {timeout}s'
+                render_pool(workers).shutdown(wait=False, kill_workers=True)
+                for other in list(pending)[1:]:
+                    submit(other)
+            except (BrokenProcessPool, ShutdownExecutorError) as e:
+                # A worker died, every task in flight is lost with it
+                result, error = None, f'Worker crashed: {e}'
+                for other in list(pending)[1:]:
+                    submit(other)
+            except Exception as e:
+                result, error = None, str(e)
+
+            if error is not None and task['attempts'] < retries:
+                task['attempts'] += 1
+                submit(task)
+                continue
+
+            pending.popleft()
+            yield task['item'], result, error
+    finally:
+        # The download was closed early, its queued tasks are not needed
+        for task in pending:
+            task['future'].cancel()
+
+
+def render_pool(workers):
+    """
+    The process-wide rendering pool of loky, started on first use.
+
+    A pool that was shut down or lost a worker is replaced by a new one on
+    the next call.
+    """
+    return get_reusable_executor(max_workers=workers)
+
+
+def _render_in_process(render, item, retries):
+    for attempt in range(retries + 1):
+        try:
+            return render(item), None
+        except Exception as e:
+            error = str(e)
+    return None, error
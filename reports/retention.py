@@ -0,0 +1,108 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Report
+
+# Files no report points at are only removed after this long, a worker saves
+# a report's file before recording it on the report
+ORPHAN_GRACE = timedelta(hours=1)
+
+
+def storage_quota():
+    return getattr(settings, 'REPORT_STORAGE_QUOTA', 2 * 1024 ** 3)
+
+
+def max_age():
+    return timedelta(days=getattr(settings, 'REPORT_MAX_AGE_DAYS', 90))
+
+
+def sweep_interval():
+    return getattr(settings, 'REPORT_SWEEP_INTERVAL', 60 * 60)
+
+
+def reports_root():
+    return os.path.join(settings.MEDIA_ROOT, 'reports')
+
+
+def last_used():
+    """
+    When every referenced report file was last used, one GROUP BY query.
+
+    A file shared by several reports (cache hits) counts as used by the
+    latest download or generation of any of them.
+    """
+    rows = (
+        Report.objects.exclude(file_path='').order_by().values('file_path')
+        .annotate(downloaded=Max('last_downloaded_at'), finished=Max('finished_at'), generated=Max('generated_at'))
+    )
+    return {
+        row['file_path']: max(value for value in (row['downloaded'], row['finished'], row['generated']) if value)
+        for row in rows
+    }
+
+
+def report_files():
+    """(path relative to MEDIA_ROOT, size, modification time) of every file under MEDIA_ROOT/reports"""
+    for folder, _, filenames in os.walk(reports_root()):
+        for filename in filenames:
+            path = os.path.join(folder, filename)
+            stat = os.stat(path)
+            yield os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/'), stat.st_size, stat.st_mtime
+
+
+def remove_empty_folders():
+    for folder, subfolders, filenames in os.walk(reports_root(), topdown=False):
+        if folder != reports_root() and not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def sweep_report_files(quota=None, age=None, dry_run=False):
+    """
+    Keep MEDIA_ROOT/reports within the byte quota and the maximum age.
+
+    Files no report points at are removed after ORPHAN_GRACE. Then files
+    not used for longer than `age` are evicted, then the least recently
+    used ones until the folder fits in `quota` bytes. Reports keep their
+    file path and are regenerated when downloaded again. Returns the
+    number of files removed, the bytes freed and the bytes still used.
+    """
+    quota = storage_quota() if quota is None else quota
+    age = max_age() if age is None else age
+    now = timezone.now()
+    used = last_used()
+
+    removed = []
+    kept = []
+    for path, size, modified in report_files():
+        if path in used:
+            kept.append((used[path], path, size))
+        elif now.timestamp() - modified > ORPHAN_GRACE.total_seconds():
+            removed.append((path, size))
+        else:
+            kept.append((now, path, size))
+
+    kept.sort()
+    total = sum(size for _, _, size in kept)
+    for used_at, path, size in kept:
+        if used_at >= now - age and total <= quota:
+            break
+        removed.append((path, size))
+        total -= size
+
+    if not dry_run:
+        for path, _ in removed:
+            try:
+                os.remove(os.path.join(settings.MEDIA_ROOT, path))
+            except FileNotFoundError:
+                pass
+        remove_empty_folders()
+
+    return {
+        'files_removed': len(removed),
+        'bytes_freed': sum(size for _, size in removed),
+        'bytes_used': total,
+    }
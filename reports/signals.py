@@ -0,0 +1,17 @@
+from django.db import transaction
+
+from .clustering import assign_students, queue_assignments
+
+# Fitting is left to the report worker, an import only waits for its
+# students to be assigned to the models that already exist
+
+
+def student_saved(sender, instance, **kwargs):
+    """Queue a saved student for the report worker to put in the nearest performance group"""
+    student_id = instance.pk
+    transaction.on_commit(lambda: queue_assignments([student_id]))
+
+
+def students_imported(sender, student_ids, **kwargs):
+    """Assign the students of an import in one vectorized batch"""
+    assign_students(student_ids, refit=False)
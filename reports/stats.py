@@ -0,0 +1,163 @@
+from collections import Counter
+
+from django.db.models import Avg, Count, Prefetch, Q
+
+from schools.models import Class, School
+from students.models import Student, StudentTestResult
+
+BMI_CATEGORIES = Student.BMI_CATEGORIES
+
+
+def percentage(count, total):
+    return count / total * 100 if total else 0
+
+
+def bmi_distribution(students):
+    """Total students and the count of each BMI category, one aggregate query"""
+    counts = students.aggregate(
+        total=Count('pk'),
+        **{category: Count('pk', filter=Q(bmi_category=category)) for category, _ in BMI_CATEGORIES}
+    )
+    total = counts['total']
+    return total, [
+        {
+            'category': category,
+            'label': label,
+            'count': counts[category],
+            'percentage': percentage(counts[category], total),
+        }
+        for category, label in BMI_CATEGORIES
+    ]
+
+
+def class_breakdown(school):
+    """Size, average BMI and healthy share of every class of a school, one GROUP BY query"""
+    classes = (
+        Class.objects.filter(school=school)
+        .annotate(
+            total=Count('students'),
+            avg_bmi=Avg('students__bmi'),
+            healthy=Count('students', filter=Q(students__bmi_category='healthy')),
+        )
+        .values('grade', 'section', 'total', 'avg_bmi', 'healthy')
+        # Meta.ordering is not applied to GROUP BY queries
+        .order_by('grade', 'section')
+    )
+    return [
+        {
+            'label': f"Grade {row['grade']} Sec {row['section']}",
+            'total': row['total'],
+            'avg_bmi': row['avg_bmi'] or 0,
+            'healthy_percentage': percentage(row['healthy'], row['total']),
+            'at_risk_percentage': percentage(row['total'] - row['healthy'], row['total']),
+        }
+        for row in classes
+    ]
+
+
+def school_report_data(school_id):
+    """
+    Everything a school report shows, as plain Python structures.
+
+    Three queries whatever the number of classes: the school, the BMI
+    distribution of its students and the class breakdown.
+    """
+    school = School.objects.get(id=school_id)
+    total, distribution = bmi_distribution(Student.objects.filter(class_assigned__school=school))
+    return {
+        'name': school.name,
+        'address': school.address,
+        'total_students': total,
+        'bmi_distribution': distribution,
+        'classes': class_breakdown(school),
+    }
+
+
+def category_histogram(students):
+    """Count of each BMI category present among already loaded students"""
+    counts = Counter(student.bmi_category for student in students)
+    return [
+        {'category': category, 'label': label, 'count': counts[category]}
+        for category, label in BMI_CATEGORIES
+        if counts.get(category)
+    ]
+
+
+def class_report_data(class_id):
+    """
+    Everything a class report shows, as plain Python structures.
+
+    Two queries whatever the class size: the class with its school and its
+    prefetched students, the BMI category histogram is counted from those.
+    """
+    class_obj = (
+        Class.objects.select_related('school')
+        .prefetch_related(Prefetch('students', queryset=Student.objects.order_by('roll_number')))
+        .get(id=class_id)
+    )
+    students = class_obj.students.all()
+    return {
+        'school': class_obj.school.name,
+        'grade': class_obj.grade,
+        'section': class_obj.section,
+        'total_students': len(students),
+        'students': [
+            {
+                'roll_number': student.roll_number,
+                'name': student.name,
+                'age': student.age,
+                'gender': student.get_gender_display(),
+                'height': student.height,
+                'weight': student.weight,
+                'bmi': student.bmi,
+                'bmi_category': student.get_bmi_category_display(),
+            }
+            for student in students
+        ],
+        'bmi_distribution': category_histogram(students),
+    }
+
+
+def individual_report_students(students):
+    """
+    The students with everything an individual report shows.
+
+    Class and school are joined and the latest result of every test is
+    prefetched with its test, so any number of students costs two queries.
+    """
+    return students.select_related('class_assigned__school').prefetch_related(
+        Prefetch(
+            'test_results',
+            queryset=StudentTestResult.objects.latest_scores().select_related('test'),
+            to_attr='latest_results',
+        )
+    )
+
+
+def individual_report_data(student):
+    """Everything an individual report shows, from a student of individual_report_students()"""
+    class_obj = student.class_assigned
+    return {
+        'school': class_obj.school.name,
+        'grade': class_obj.grade,
+        'section': class_obj.section,
+        'name': student.name,
+        'roll_number': student.roll_number,
+        'date_of_birth': student.date_of_birth,
+        'age': student.age,
+        'gender': student.get_gender_display(),
+        'height': student.height,
+        'weight': student.weight,
+        'bmi': student.bmi,
+        'bmi_category': student.get_bmi_category_display(),
+        'overall_comment': student.overall_comment,
+        'test_results': [
+            {
+                'test': result.test.name,
+                'score': result.score,
+                'unit': result.test.unit,
+                'comment': result.comment,
+            }
+            for result in student.latest_results
+        ],
+    }
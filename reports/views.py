@@ -1,13 +1,17 @@
 from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import HttpResponse, FileResponse
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.views.generic import ListView, CreateView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from .batch import stream_individual_reports
+from .caching import cache_stats
+from .jobs import enqueue_report, requeue_report
 from .models import Report
-from .utils import generate_individual_report, generate_class_report, generate_school_report, apply_clustering
+from .utils import apply_clustering
 from students.models import Student
 from schools.models import School, Class
 import os
@@ -19,6 +23,30 @@ class ReportListView(ListView):
     context_object_name = 'reports'
     paginate_by = 20
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('generated_by')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cache_stats'] = cache_stats()
+        return context
+
+def report_progress(request):
+    """JSON status of the given reports, polled by the report list while some are unfinished"""
+    ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.isdigit()]
+    return JsonResponse({
+        'reports': [
+            {
+                'id': report.pk,
+                'status': report.status,
+                'duration': report.duration,
+                'error_message': report.error_message,
+                'finished': report.is_finished,
+            }
+            for report in Report.objects.filter(pk__in=ids)
+        ]
+    })
+
 # def generate_report_view(request):
 #     if request.method == 'POST':
 #         report_type = request.POST.get('report_type')
@@ -90,33 +118,28 @@ class ReportListView(ListView):
 #     return render(request, 'reports/generate_report.html', context)
 
 def generate_individual_report_view(request, student_id):
-    """Generate individual report directly for a specific student"""
+    """Queue an individual report for a specific student"""
     try:
         student = get_object_or_404(Student, pk=student_id)
-        
-        # Generate individual report
-        file_path = generate_individual_report(student_id)
-        
-        # Create report record
-        report = Report.objects.create(
-            title=f"Individual Report - {student.name}",
-            report_type='individual',
-            generated_by=request.user if request.user.is_authenticated else None,
-            file_path=file_path
+
+        # Queue individual report, the report worker generates it
+        enqueue_report(
+            'individual',
+            student.pk,
+            f"Individual Report - {student.name}",
+            request.user if request.user.is_authenticated else None,
         )
-        
-        messages.success(request, f'Individual report generated successfully for {student.name}!')
-        
-        # Redirect to download the report immediately
-        return redirect('reports:download', pk=report.pk)
-        
+
+        messages.success(request, f'Individual report for {student.name} queued, download it from the list once it is done.')
+        return redirect('reports:list')
+
     except Exception as e:
         messages.error(request, f'Error generating report: {str(e)}')
         return redirect('students:detail', pk=student_id)
 
 
 def generate_report_view(request):
-    """Main report generation view"""
+    """Main report generation view, reports are queued for the report worker"""
     schools = School.objects.all()
     classes = Class.objects.all()
     students = Student.objects.all()
@@ -126,40 +149,25 @@ def generate_report_view(request):
 
         try:
             if report_type == 'individual':
-                student_id = request.POST.get('student_id')
-                file_path, filename = generate_individual_report(student_id)
-                student = Student.objects.get(id=student_id)
-                title = f"Individual Report - {student.name}"
+                student = Student.objects.get(id=request.POST.get('student_id'))
+                target_id, title = student.pk, f"Individual Report - {student.name}"
 
             elif report_type == 'class':
-                class_id = request.POST.get('class_id')
-                file_path, filename = generate_class_report(class_id)
-                class_obj = Class.objects.get(id=class_id)
-                title = f"Class Report - Grade {class_obj.grade} Section {class_obj.section}"
+                class_obj = Class.objects.get(id=request.POST.get('class_id'))
+                target_id, title = class_obj.pk, f"Class Report - Grade {class_obj.grade} Section {class_obj.section}"
 
             elif report_type == 'school':
-                school_id = request.POST.get('school_id')
-                file_path, filename = generate_school_report(school_id)
-                school = School.objects.get(id=school_id)
-                title = f"School Report - {school.name}"
-
-            # Save report record
-            report = Report.objects.create(
-                title=title,
-                report_type=report_type,
-                generated_by=request.user,
-                file_path=f"reports/{filename}"
-            )
-
-            messages.success(request, f'Report generated successfully!')
-
-            # Return file for download
-            response = FileResponse(
-                open(file_path, 'rb'),
-                as_attachment=True,
-                filename=filename
-            )
-            return response
+                school = School.objects.get(id=request.POST.get('school_id'))
+                target_id, title = school.pk, f"School Report - {school.name}"
+
+            else:
+                raise ValueError(f'Unknown report type: {report_type}')
+
+            # Save report record, the report worker generates the file
+            enqueue_report(report_type, target_id, title, request.user)
+
+            messages.success(request, f'Report queued, download it from the list once it is done.')
+            return redirect('reports:list')
 
         except Exception as e:
             messages.error(request, f'Error generating report: {str(e)}')
@@ -172,13 +180,49 @@ def generate_report_view(request):
 
     return render(request, 'reports/generate_report.html', context)
 
+def generate_batch_reports_view(request):
+    """Stream the individual reports of every student of a class or a school as one ZIP"""
+    if request.method != 'POST':
+        return redirect('reports:generate')
+
+    class_id = request.POST.get('class_id')
+    school_id = request.POST.get('school_id')
+    if class_id:
+        class_obj = get_object_or_404(Class.objects.select_related('school'), pk=class_id)
+        students = Student.objects.filter(class_assigned=class_obj)
+        filename = f"individual_reports_{class_obj.school.name}_grade_{class_obj.grade}_section_{class_obj.section}.zip"
+    elif school_id:
+        school = get_object_or_404(School, pk=school_id)
+        students = Student.objects.filter(class_assigned__school=school)
+        filename = f"individual_reports_{school.name}.zip"
+    else:
+        messages.error(request, 'Select a class or a school')
+        return redirect('reports:generate')
+
+    if not students.exists():
+        messages.warning(request, 'No students to generate reports for')
+        return redirect('reports:generate')
+
+    response = StreamingHttpResponse(
+        stream_individual_reports(students, by_class=not class_id),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename.replace(" ", "_")}"'
+    return response
+
 def apply_clustering_view(request):
-    """Apply K-means clustering to students"""
+    """Queue K-means clustering of the students of every school or a single one"""
     if request.method == 'POST':
+        school_id = request.POST.get('school_id')
+        school = get_object_or_404(School, pk=school_id) if school_id else None
         try:
-            success = apply_clustering()
-            if success:
-                messages.success(request, 'Student clustering applied successfully!')
+            queued = apply_clustering(school, by_gender=bool(request.POST.get('by_gender')))
+            if queued:
+                scope = school.name if school else 'all schools'
+                messages.success(
+                    request,
+                    f'Clustering queued for {scope} ({queued} grade groups), the report worker applies it shortly.'
+                )
             else:
                 messages.warning(request, 'Not enough data for clustering (minimum 3 students required)')
         except Exception as e:
@@ -187,16 +231,24 @@ def apply_clustering_view(request):
     return redirect('reports:generate')
 
 def download_report(request, report_id):
-    """Download existing report"""
+    """Download existing report, files evicted from disk are generated again"""
     report = get_object_or_404(Report, id=report_id)
+    if report.status != 'done':
+        messages.info(request, 'This report is not ready yet')
+        return redirect('reports:list')
     file_path = os.path.join(settings.MEDIA_ROOT, str(report.file_path))
 
     if os.path.exists(file_path):
+        Report.objects.filter(pk=report.pk).update(last_downloaded_at=timezone.now())
         return FileResponse(
             open(file_path, 'rb'),
             as_attachment=True,
             filename=os.path.basename(file_path)
         )
+    elif report.target_id is not None:
+        requeue_report(report)
+        messages.info(request, 'This report was cleaned up to save space and is being generated again, download it once it is done')
+        return redirect('reports:list')
     else:
         messages.error(request, 'Report file not found')
         return redirect('reports:list')
@@ -205,8 +257,9 @@ def delete_report(request, pk):
     if request.method == 'POST':
         report = get_object_or_404(Report, pk=pk)
         
-        # Delete file if exists
-        if report.file_path and os.path.exists(report.file_path.path):
+        # Delete file if exists and no cached copy of the report still uses it
+        shared = Report.objects.filter(file_path=report.file_path.name).exclude(pk=report.pk).exists()
+        if report.file_path and not shared and os.path.exists(report.file_path.path):
             os.remove(report.file_path.path)
         
         report.delete()
@@ -48,6 +48,7 @@ class Class(models.Model):
     grade = models.CharField(max_length=10, choices=GRADE_CHOICES, verbose_name="Grade")
     section = models.CharField(max_length=5, choices=SECTION_CHOICES, verbose_name="Section")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
       verbose_name = "Class"
@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import Student, PhysicalTest, StudentTestResult
+from .models import Student, PhysicalTest, StudentTestResult, NormTable, ImportJob
 
 @admin.register(PhysicalTest)
 class PhysicalTestAdmin(admin.ModelAdmin):
-    list_display = ['name', 'unit', 'description']
+    list_display = ['name', 'unit', 'lower_is_better', 'description']
     search_fields = ['name']
 
 @admin.register(Student)
@@ -15,6 +15,18 @@ class StudentAdmin(admin.ModelAdmin):
 
 @admin.register(StudentTestResult)
 class StudentTestResultAdmin(admin.ModelAdmin):
-    list_display = ['student', 'test', 'score', 'test_date']
-    list_filter = ['test', 'test_date']
+    list_display = ['student', 'test', 'score', 'test_date', 'term']
+    list_filter = ['test', 'test_date', 'term']
     search_fields = ['student__name']
+
+@admin.register(NormTable)
+class NormTableAdmin(admin.ModelAdmin):
+    list_display = ['test', 'grade', 'gender', 'school', 'sample_size', 'built_at']
+    list_filter = ['test', 'grade', 'gender']
+    readonly_fields = ['quantiles', 'sample_size', 'built_at']
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'school', 'mode', 'test_date', 'status', 'rows_processed', 'total_rows', 'imported_count', 'updated_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'school']
+    readonly_fields = ['rows_processed', 'imported_count', 'updated_count', 'unchanged_count', 'row_errors', 'started_at', 'finished_at']
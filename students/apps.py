@@ -1,6 +1,46 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_migrate, pre_save
+
+
+# Apps whose tables the SQLite search triggers name
+SEARCH_INDEX_APPS = {'students', 'schools'}
+
+
+def plan_rebuilds_search_tables(plan):
+    return any(migration.app_label in SEARCH_INDEX_APPS for migration, _ in plan or ())
+
+
+def suspend_search_index(sender, using, plan=None, **kwargs):
+    if plan_rebuilds_search_tables(plan):
+        from .search import suspend_search_index
+        suspend_search_index(connections[using])
+
+
+def resume_search_index(sender, using, plan=None, **kwargs):
+    if plan_rebuilds_search_tables(plan):
+        from .search import resume_search_index
+        resume_search_index(connections[using])
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        # The SQLite search triggers would break migrations that rebuild the
+        # student or school tables, they are dropped while those run
+        pre_migrate.connect(suspend_search_index, sender=self)
+        post_migrate.connect(resume_search_index, sender=self)
+
+        # Keep percentiles current when results or students are edited one by
+        # one, bulk imports recompute their touched cohorts themselves
+        from . import signals
+        Student = self.get_model('Student')
+        StudentTestResult = self.get_model('StudentTestResult')
+        pre_save.connect(signals.result_pre_save, sender=StudentTestResult)
+        post_save.connect(signals.result_changed, sender=StudentTestResult)
+        pre_delete.connect(signals.result_pre_delete, sender=StudentTestResult)
+        post_delete.connect(signals.result_deleted, sender=StudentTestResult)
+        pre_save.connect(signals.student_pre_save, sender=Student)
+        post_save.connect(signals.student_post_save, sender=Student)
@@ -1,7 +1,9 @@
+from datetime import date
+
 from django import forms
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Submit, Layout, Field, Div, HTML, Row, Column
-from .models import Student, PhysicalTest, StudentTestResult
+from .models import Student, PhysicalTest, StudentTestResult, ImportJob
 
 from schools.models import Class  # Import the Class model
 
@@ -57,13 +59,36 @@ class StudentForm(forms.ModelForm):
 class ImportStudentsForm(forms.Form):
     excel_file = forms.FileField(
         label='Excel File',
-        help_text='Upload an Excel file (.xlsx) with student data'
+        help_text='Upload an Excel (.xlsx) or CSV (.csv) file with student data'
     )
     school = forms.ModelChoiceField(
         queryset=None,
         label='Select School',
         empty_label='Choose a school...'
     )
+    test_date = forms.DateField(
+        initial=date.today,
+        label='Assessment Date',
+        help_text='Test scores are stored as results of this date, earlier results are kept as history',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    mode = forms.ChoiceField(
+        choices=ImportJob.MODE_CHOICES,
+        initial='create',
+        label='Existing Students',
+        help_text='Update mode only rewrites students whose row changed since the last import'
+    )
+    on_error = forms.ChoiceField(
+        choices=ImportJob.ON_ERROR_CHOICES,
+        initial='quarantine',
+        label='Invalid Rows',
+        help_text='All rows are validated before anything is written'
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Dry run',
+        help_text='Only validate the file and produce the error report, nothing is imported'
+    )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
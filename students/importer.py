@@ -0,0 +1,385 @@
+import hashlib
+import math
+from datetime import date, datetime
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from schools.models import Class
+from .models import Student, PhysicalTest, StudentTestResult
+from .percentiles import recompute_percentiles
+from .signals import students_imported
+from .readers import SheetReader
+from .validation import normalize_frame
+
+REQUIRED_COLUMNS = ['Roll', 'Name', 'Class', 'Section', 'DOB', 'Gender', 'Height', 'Weight']
+
+# Sheet headers that map to a physical test, with the unit used when the test
+# has to be created. Extend or override with the STUDENT_IMPORT_TEST_COLUMNS
+# setting, e.g. {'Sit & Reach': {'test': 'Sit and Reach', 'unit': 'cm'}}, with
+# 'lower_is_better': True for tests where a smaller score ranks higher.
+# Headers that match an existing PhysicalTest name are picked up as well.
+DEFAULT_TEST_COLUMNS = {
+    'Flamingo Balance': {'test': 'Flamingo Balance', 'unit': 'falls', 'lower_is_better': True},
+    'Plate Tapping': {'test': 'Plate Tapping', 'unit': 'seconds', 'lower_is_better': True},
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Student fields refreshed when a re-imported row has changed
+UPSERT_FIELDS = [
+    'name', 'date_of_birth', 'gender', 'height', 'weight',
+    'age', 'import_fingerprint',
+]
+
+
+def parse_dob(value):
+    """Convert a DOB cell into a date"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if pd.isna(value):
+        raise ValueError('DOB is missing')
+    return value.date() if hasattr(value, 'date') else value
+
+
+def parse_measurement(value, label):
+    """Convert a height/weight cell into a float"""
+    number = float(value)
+    if math.isnan(number):
+        raise ValueError(f'{label} is missing')
+    return number
+
+
+def test_column_aliases():
+    aliases = dict(DEFAULT_TEST_COLUMNS)
+    aliases.update(getattr(settings, 'STUDENT_IMPORT_TEST_COLUMNS', {}))
+    return {header.strip().casefold(): spec for header, spec in aliases.items()}
+
+
+def match_test_columns(columns):
+    """
+    Find the physical test columns of a sheet.
+
+    Returns {column: {'test': name, 'unit': unit}} for every header that
+    matches an existing PhysicalTest name (case-insensitively) or a
+    configured alias. Nothing is written to the database.
+    """
+    known = {
+        name.strip().casefold(): {'test': name, 'unit': unit}
+        for name, unit in PhysicalTest.objects.values_list('name', 'unit')
+    }
+    aliases = test_column_aliases()
+    matched = {}
+    for column in columns:
+        if column in REQUIRED_COLUMNS:
+            continue
+        key = str(column).strip().casefold()
+        spec = aliases.get(key) or known.get(key)
+        if spec:
+            # An alias may point at a test that already exists under another spelling
+            matched[column] = known.get(spec['test'].strip().casefold(), spec)
+    return matched
+
+
+def row_fingerprint(student, scores, test_date):
+    """Content hash of an imported row, used to skip unchanged rows on re-import"""
+    parts = [
+        student.name,
+        student.date_of_birth.isoformat(),
+        student.gender,
+        repr(student.height),
+        repr(student.weight),
+    ]
+    if scores:
+        # The same scores on a new assessment date still add a history entry
+        parts.append(test_date.isoformat())
+    parts += [f'{name}={score!r}' for name, score in sorted(scores.items())]
+    return hashlib.blake2b('\x1f'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+class ImportResult:
+    """Outcome of an import run"""
+
+    def __init__(self):
+        self.imported_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.rows_processed = 0
+        self.errors = []
+
+    def merge(self, other):
+        self.imported_count += other.imported_count
+        self.updated_count += other.updated_count
+        self.unchanged_count += other.unchanged_count
+        self.rows_processed += other.rows_processed
+        self.errors.extend(other.errors)
+
+
+class StudentImporter:
+    """
+    Set-based student import.
+
+    Classes and physical tests are cached in lookup maps and only queried
+    when a chunk brings unseen keys. Rows are written chunk by chunk: one
+    keyed lookup for existing students, a bulk_create for new ones and a
+    single bulk upsert of the melted test results, all inside a per-chunk
+    transaction. In upsert mode each row's fingerprint is compared with the
+    one stored on the student, and only changed students go through
+    bulk_update. Chunks can come from an in-memory DataFrame or be streamed
+    from a file, so peak memory is bounded by the chunk size. Once every
+    chunk is written, percentiles are recomputed for the cohorts that
+    received new scores.
+    """
+
+    def __init__(self, school, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None, skip_rows=(), update_existing=False,
+                 test_date=None):
+        self.school = school
+        self.chunk_size = chunk_size
+        # Assessment date of the sheet's test scores, results are kept per date
+        self.test_date = test_date or date.today()
+        # Upsert mode: existing students whose row fingerprint changed are updated
+        self.update_existing = update_existing
+        # 0-based sheet rows quarantined by validation, counted but never written
+        self.skip_rows = set(skip_rows)
+        # Called as on_chunk(result, chunk_result) inside each chunk's
+        # transaction, so progress can be committed together with the data
+        self.on_chunk = on_chunk
+        self.classes = {}
+        self.tests = {}
+        # (test, grade, gender, school) cohorts that received scores
+        self.touched_cohorts = set()
+        # Students created or updated, announced with students_imported
+        self.written_students = []
+        # Errors raised by students_imported receivers, the students are
+        # written already so they do not fail the import
+        self.receiver_errors = []
+
+    def run(self, df):
+        """Import an in-memory DataFrame"""
+        batches = (df.iloc[start:start + self.chunk_size] for start in range(0, len(df), self.chunk_size))
+        return self.run_batches(batches, df.columns)
+
+    def run_file(self, upload, start=0, result=None):
+        """Stream an uploaded .xlsx/.csv file through the importer batch by batch"""
+        with SheetReader(upload, batch_size=self.chunk_size) as reader:
+            return self.run_batches(reader.batches(start), reader.columns, result)
+
+    def run_batches(self, batches, columns, result=None):
+        result = result or ImportResult()
+        self.tests = self._resolve_tests(match_test_columns(columns))
+        for chunk in batches:
+            self.import_chunk(chunk, result)
+        if self.touched_cohorts:
+            recompute_percentiles(self.touched_cohorts)
+        if self.written_students:
+            responses = students_imported.send_robust(
+                sender=self.__class__, school=self.school, student_ids=self.written_students
+            )
+            # send_robust logs the errors of failing receivers
+            self.receiver_errors += [
+                f'After import: {response}' for _, response in responses if isinstance(response, Exception)
+            ]
+        return result
+
+    def _resolve_classes(self, keys):
+        """Add the classes for the given (grade, section) keys to the lookup map"""
+        missing = [key for key in keys if key not in self.classes]
+        if not missing:
+            return
+        existing = {
+            (c.grade, c.section): c
+            for c in Class.objects.filter(school=self.school)
+        }
+        to_create = [
+            Class(school=self.school, grade=grade, section=section)
+            for grade, section in missing if (grade, section) not in existing
+        ]
+        if to_create:
+            Class.objects.bulk_create(to_create, ignore_conflicts=True)
+            existing = {
+                (c.grade, c.section): c
+                for c in Class.objects.filter(school=self.school)
+            }
+        self.classes.update(existing)
+
+    def _resolve_tests(self, matched):
+        """Map each test column to its PhysicalTest, creating missing tests"""
+        if not matched:
+            return {}
+        names = {spec['test'] for spec in matched.values()}
+        existing = {t.name: t for t in PhysicalTest.objects.filter(name__in=names)}
+        for spec in matched.values():
+            if spec['test'] not in existing:
+                existing[spec['test']] = PhysicalTest.objects.create(
+                    name=spec['test'],
+                    unit=spec['unit'],
+                    lower_is_better=spec.get('lower_is_better', False),
+                )
+        return {column: existing[spec['test']] for column, spec in matched.items()}
+
+    def import_chunk(self, chunk, result):
+        """Parse, look up and write one chunk of rows"""
+        chunk_result = ImportResult()
+        chunk_result.rows_processed = len(chunk)
+        if self.skip_rows:
+            chunk = chunk[~chunk.index.isin(self.skip_rows)]
+        chunk = normalize_frame(chunk.copy())
+        self._resolve_classes(set(zip(chunk['Class'], chunk['Section'])))
+
+        scores = self.score_frame(chunk)
+
+        parsed = []
+        for index, row in zip(chunk.index, chunk.to_dict('records')):
+            try:
+                parsed.append((index, self.parse_row(row)))
+            except Exception as e:
+                chunk_result.errors.append(f'Row {index + 2}: {str(e)}')
+
+        try:
+            with transaction.atomic():
+                written = self.write_rows(parsed, scores, chunk_result)
+                self.checkpoint(result, chunk_result)
+            self.written_students.extend(written)
+        except Exception as e:
+            if not parsed:
+                raise
+            chunk_result.imported_count = chunk_result.updated_count = chunk_result.unchanged_count = 0
+            first, last = parsed[0][0] + 2, parsed[-1][0] + 2
+            chunk_result.errors.append(f'Rows {first}-{last}: {str(e)}')
+            with transaction.atomic():
+                self.checkpoint(result, chunk_result)
+
+        result.merge(chunk_result)
+
+    def checkpoint(self, result, chunk_result):
+        """Report a finished chunk to the on_chunk callback, if any"""
+        if self.on_chunk:
+            self.on_chunk(result, chunk_result)
+
+    def parse_row(self, row):
+        class_obj = self.classes[(row['Class'], row['Section'])]
+        student = Student(
+            roll_number=str(row['Roll']),
+            class_assigned=class_obj,
+            name=str(row['Name']),
+            date_of_birth=parse_dob(row['DOB']),
+            gender='M' if str(row['Gender']).upper().startswith('M') else 'F',
+            height=parse_measurement(row['Height'], 'Height'),
+            weight=parse_measurement(row['Weight'], 'Weight'),
+        )
+        # bulk_create bypasses save(), so fill the age here, BMI is generated by the database
+        student.age = student.calculate_age()
+
+        scores = {}
+        for column, test in self.tests.items():
+            if pd.notna(row[column]):
+                scores[test.name] = float(row[column])
+        student.import_fingerprint = row_fingerprint(student, scores, self.test_date)
+        return student
+
+    def score_frame(self, chunk):
+        """Test columns of a chunk as numbers, with columns renamed to test ids"""
+        columns = list(self.tests)
+        frame = chunk[columns].apply(pd.to_numeric, errors='coerce')
+        frame.columns = [self.tests[column].pk for column in columns]
+        return frame
+
+    def write_rows(self, parsed, scores, chunk_result):
+        """Insert new students, update changed ones and write their test results, returns their pks"""
+        if not parsed:
+            return []
+
+        class_ids = {student.class_assigned_id for _, student in parsed}
+        rolls = {student.roll_number for _, student in parsed}
+        students = {
+            (s.class_assigned_id, s.roll_number): s
+            for s in Student.objects.filter(
+                class_assigned_id__in=class_ids, roll_number__in=rolls
+            ).only('id', 'class_assigned_id', 'roll_number', 'gender', 'import_fingerprint')
+        }
+
+        # First occurrence of a (class, roll) wins, like get_or_create
+        seen = set()
+        new_students = []
+        changed_students = []
+        touched = []
+        now = timezone.now()
+        for index, student in parsed:
+            key = (student.class_assigned_id, student.roll_number)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            existing = students.get(key)
+            if existing is None:
+                students[key] = student
+                new_students.append(student)
+            elif not self.update_existing:
+                # Existing students are left alone, only missing results are added
+                pass
+            elif existing.import_fingerprint == student.import_fingerprint:
+                chunk_result.unchanged_count += 1
+                continue
+            else:
+                for field in UPSERT_FIELDS:
+                    setattr(existing, field, getattr(student, field))
+                existing.updated_at = now
+                changed_students.append(existing)
+            touched.append((index, students[key]))
+
+        Student.objects.bulk_create(new_students, batch_size=self.chunk_size)
+        Student.objects.bulk_update(changed_students, UPSERT_FIELDS + ['updated_at'], batch_size=self.chunk_size)
+        chunk_result.imported_count += len(new_students)
+        chunk_result.updated_count += len(changed_students)
+
+        if self.tests and touched:
+            self._write_results(touched, scores)
+        return [student.pk for student in new_students + changed_students]
+
+    def _write_results(self, touched, scores):
+        """
+        Melt the touched rows' scores into long (student, test, score) form
+        and write them with one bulk upsert. Results are kept per assessment
+        date, so a sheet for a new term appends history; on the same date,
+        update mode replaces changed scores and create mode keeps the stored
+        ones.
+        """
+        owners = pd.Series(
+            [student.pk for _, student in touched],
+            index=[index for index, _ in touched],
+        )
+        long = (
+            scores.loc[owners.index]
+            .melt(ignore_index=False, var_name='test_id', value_name='score')
+            .dropna(subset=['score'])
+        )
+        long['student_id'] = owners.reindex(long.index).to_numpy()
+        # Two headers can alias the same test, the leftmost one wins
+        long = long.drop_duplicates(subset=['student_id', 'test_id'], keep='first')
+        if long.empty:
+            return
+
+        grades = {c.pk: c.grade for c in self.classes.values()}
+        profiles = {student.pk: (grades[student.class_assigned_id], student.gender) for _, student in touched}
+        for student_id, test_id in long[['student_id', 'test_id']].drop_duplicates().itertuples(index=False):
+            grade, gender = profiles[student_id]
+            self.touched_cohorts.add((test_id, grade, gender, self.school.pk))
+
+        results = [
+            StudentTestResult(student_id=student_id, test_id=test_id, score=score, test_date=self.test_date)
+            for student_id, test_id, score in zip(
+                long['student_id'].tolist(), long['test_id'].tolist(), long['score'].tolist()
+            )
+        ]
+        if self.update_existing:
+            StudentTestResult.objects.bulk_create(
+                results,
+                batch_size=self.chunk_size,
+                update_conflicts=True,
+                unique_fields=['student', 'test', 'test_date'],
+                update_fields=['score', 'updated_at'],
+            )
+        else:
+            StudentTestResult.objects.bulk_create(results, batch_size=self.chunk_size, ignore_conflicts=True)
@@ -0,0 +1,146 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+
+from .importer import StudentImporter, DEFAULT_CHUNK_SIZE, match_test_columns
+from .models import ImportJob
+from .readers import SheetReader
+from .services import keep_alive
+from .validation import SheetValidator
+
+# A running job that has not committed a batch or sent a heartbeat for this
+# long is considered abandoned by a dead worker and is put back on the queue
+STALE_AFTER = timedelta(minutes=5)
+
+# Seconds between heartbeats of a running job, well within STALE_AFTER
+HEARTBEAT_INTERVAL = 60
+
+
+def enqueue_import(school, upload, mode='create', on_error='quarantine', dry_run=False, test_date=None):
+    """Persist an upload as a queued import job"""
+    job = ImportJob(school=school, mode=mode, on_error=on_error, dry_run=dry_run)
+    if test_date:
+        job.test_date = test_date
+    job.upload.save(upload.name, upload, save=False)
+    with SheetReader(job.upload.path) as reader:
+        job.total_rows = reader.count_rows()
+    job.save()
+    return job
+
+
+def requeue_stale_jobs(stale_after=STALE_AFTER):
+    """Put jobs abandoned by a crashed or restarted worker back on the queue"""
+    cutoff = timezone.now() - stale_after
+    return ImportJob.objects.filter(status='running', updated_at__lt=cutoff).update(status='queued')
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running, returns None if the queue is empty"""
+    while True:
+        job = ImportJob.objects.filter(status='queued').order_by('created_at').first()
+        if job is None:
+            return None
+        claimed = ImportJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running',
+            started_at=job.started_at or timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def heartbeat(job):
+    """Mark a running job as alive, see requeue_stale_jobs()"""
+    ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now())
+
+
+def validate_import_job(job):
+    """
+    Validate the whole upload before anything is written.
+
+    The complete error report is saved on the job along with the rows that
+    failed, which the import then skips.
+    """
+    with SheetReader(job.upload.path, batch_size=DEFAULT_CHUNK_SIZE) as reader:
+        validator = SheetValidator(match_test_columns(reader.columns))
+        for batch in reader.batches():
+            validator.validate(batch)
+
+    report = StringIO()
+    validator.write_report(report)
+    job.error_report.save(f'import_{job.pk}_errors.csv', ContentFile(report.getvalue().encode()), save=False)
+    job.invalid_rows = sorted(validator.invalid_rows)
+    job.total_rows = validator.rows_checked
+    job.validated = True
+    job.save(update_fields=['error_report', 'invalid_rows', 'total_rows', 'validated', 'updated_at'])
+    return validator
+
+
+def finish_job(job, status, error_message=''):
+    ImportJob.objects.filter(pk=job.pk).update(
+        status=status, error_message=error_message, finished_at=timezone.now(), updated_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return job
+
+
+def run_import_job(job):
+    """
+    Run a claimed job, resuming after the last committed batch.
+
+    The upload is validated first. Dry runs stop there, and in reject mode
+    any invalid row fails the job before anything is written. Progress
+    counters and touched cohorts are updated inside each batch's
+    transaction, so after a restart rows_processed points exactly at the
+    first row not yet written, and the percentiles of batches written
+    before the restart are recomputed along with the others. A background
+    heartbeat keeps the job from being requeued through validation and the
+    percentile and clustering steps that follow the last batch.
+    """
+    with keep_alive(lambda: heartbeat(job), HEARTBEAT_INTERVAL):
+        return _run_import_job(job)
+
+
+def _run_import_job(job):
+    try:
+        if not job.validated:
+            validate_import_job(job)
+    except Exception as e:
+        return finish_job(job, 'failed', f'Validation error: {str(e)}')
+
+    if job.dry_run:
+        return finish_job(job, 'done')
+    if job.invalid_rows and job.on_error == 'reject':
+        return finish_job(job, 'failed', f'{len(job.invalid_rows)} invalid rows, nothing was imported. See the error report.')
+
+    def on_chunk(result, chunk_result):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=F('rows_processed') + chunk_result.rows_processed,
+            imported_count=F('imported_count') + chunk_result.imported_count,
+            updated_count=F('updated_count') + chunk_result.updated_count,
+            unchanged_count=F('unchanged_count') + chunk_result.unchanged_count,
+            row_errors=job.row_errors + chunk_result.errors,
+            touched_cohorts=sorted(importer.touched_cohorts),
+            updated_at=timezone.now(),
+        )
+        job.row_errors = job.row_errors + chunk_result.errors
+
+    try:
+        importer = StudentImporter(
+            job.school,
+            on_chunk=on_chunk,
+            skip_rows=job.invalid_rows,
+            update_existing=job.mode == 'upsert',
+            test_date=job.test_date,
+        )
+        importer.touched_cohorts.update(tuple(cohort) for cohort in job.touched_cohorts)
+        importer.run_file(job.upload.path, start=job.rows_processed)
+    except Exception as e:
+        return finish_job(job, 'failed', str(e))
+    if importer.receiver_errors:
+        ImportJob.objects.filter(pk=job.pk).update(row_errors=job.row_errors + importer.receiver_errors)
+    return finish_job(job, 'done')
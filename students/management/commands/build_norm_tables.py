@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from students.norms import NORM_MIN_SAMPLE_SIZE, build_norm_tables
+from students.percentiles import recompute_percentiles
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the norm tables from the latest scores, meant to run on a schedule'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-sample-size', type=int, default=NORM_MIN_SAMPLE_SIZE,
+                            help='Skip cohorts with fewer scores')
+        parser.add_argument('--reassign', action='store_true',
+                            help='Look every stored percentile up again in the new tables')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        built = build_norm_tables(options['min_sample_size'])
+        self.stdout.write(f'Built {built} norm tables in {time.monotonic() - started:.1f}s')
+
+        if options['reassign']:
+            results, students = recompute_percentiles()
+            self.stdout.write(f'Updated {results} result and {students} student percentiles')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from students.norms import export_norm_tables
+
+
+class Command(BaseCommand):
+    help = 'Export the norm tables as JSON, to reuse them in another deployment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write')
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'w') as handle:
+            exported = export_norm_tables(handle)
+        self.stdout.write(self.style.SUCCESS(f'Exported {exported} norm tables to {options["path"]}'))
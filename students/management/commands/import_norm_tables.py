@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from students.norms import import_norm_tables
+from students.percentiles import recompute_percentiles
+
+
+class Command(BaseCommand):
+    help = 'Import norm tables exported by export_norm_tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read')
+        parser.add_argument('--reassign', action='store_true',
+                            help='Look every stored percentile up again in the imported tables')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path']) as handle:
+                imported, skipped = import_norm_tables(handle)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not import norm tables: {e}')
+        self.stdout.write(f'Imported {imported} norm tables, skipped {skipped} of unknown schools')
+
+        if options['reassign']:
+            results, students = recompute_percentiles()
+            self.stdout.write(f'Updated {results} result and {students} student percentiles')
+        self.stdout.write(self.style.SUCCESS('Done'))
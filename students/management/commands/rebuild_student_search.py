@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from students.search import backend_for
+
+
+class Command(BaseCommand):
+    help = 'Recreate the student search index and reload it from the student table'
+
+    def handle(self, *args, **options):
+        backend = backend_for(connection)
+        backend.uninstall(connection)
+        backend.install(connection)
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({backend.__class__.__name__})'))
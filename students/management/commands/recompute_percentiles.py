@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from students.models import Student
+from students.percentiles import cohorts_for_students, recompute_percentiles
+
+
+class Command(BaseCommand):
+    help = 'Recompute test and overall percentiles of all students, or of one school\'s cohorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only recompute the cohorts of this school id')
+
+    def handle(self, *args, **options):
+        cohorts = None
+        if options['school']:
+            cohorts = cohorts_for_students(
+                Student.objects.filter(class_assigned__school_id=options['school']).values('pk')
+            )
+
+        started = time.monotonic()
+        results, students = recompute_percentiles(cohorts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {results} result and {students} student percentiles in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from students.models import Student
+from students.services import recompute_derived_fields, RECOMPUTE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recompute the age of all students (BMI and category are generated by the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only recompute students of this school id')
+        parser.add_argument('--chunk-size', type=int, default=RECOMPUTE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = Student.objects.all()
+        if options['school']:
+            queryset = queryset.filter(class_assigned__school_id=options['school'])
+
+        started = time.monotonic()
+        checked, updated = recompute_derived_fields(queryset, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} students, updated {updated} in {time.monotonic() - started:.1f}s'
+        ))
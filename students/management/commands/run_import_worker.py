@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from students.jobs import claim_next_job, requeue_stale_jobs, run_import_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued student import jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Import worker started')
+        while True:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale job(s)')
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running import job #{job.pk} from row {job.rows_processed}')
+            job = run_import_job(job)
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(
+                    f'Job #{job.pk} done: {job.imported_count} imported, {job.updated_count} updated, '
+                    f'{job.unchanged_count} unchanged, {len(job.row_errors)} row errors'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job #{job.pk} failed: {job.error_message}'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='dry_run',
+            field=models.BooleanField(default=False, verbose_name='Dry Run'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='error_report',
+            field=models.FileField(blank=True, upload_to='imports/errors/', verbose_name='Error Report'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='invalid_rows',
+            field=models.JSONField(blank=True, default=list, verbose_name='Invalid Rows'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='on_error',
+            field=models.CharField(choices=[('reject', 'Reject the whole file'), ('quarantine', 'Skip invalid rows')], default='quarantine', max_length=20, verbose_name='On Invalid Rows'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='validated',
+            field=models.BooleanField(default=False, verbose_name='Validated'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_import_validation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('create', 'Add new students only'), ('upsert', 'Add new students and update changed ones')], default='create', max_length=20, verbose_name='Mode'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_count',
+            field=models.IntegerField(default=0, verbose_name='Rows Unchanged'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_count',
+            field=models.IntegerField(default=0, verbose_name='Students Updated'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='import_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Import Fingerprint'),
+        ),
+    ]
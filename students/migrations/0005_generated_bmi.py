@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:31
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_import_fingerprints'),
+    ]
+
+    # A regular column cannot be altered into a generated one, so the stored
+    # values are dropped and the generated columns added back. The database
+    # computes them for every existing row while adding the columns.
+    operations = [
+        migrations.RemoveField(
+            model_name='student',
+            name='bmi',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='bmi_category',
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='bmi',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.math.Round(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('weight'), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)), '*', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)))), models.DecimalField(decimal_places=4, max_digits=12)), 2), models.FloatField()), output_field=models.FloatField(blank=True, null=True), verbose_name='BMI'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='bmi_category',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(django.db.models.lookups.LessThan(django.db.models.functions.comparison.Cast(django.db.models.functions.math.Round(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('weight'), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)), '*', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)))), models.DecimalField(decimal_places=4, max_digits=12)), 2), models.FloatField()), 18.5), then=models.Value('underweight')), models.When(django.db.models.lookups.LessThan(django.db.models.functions.comparison.Cast(django.db.models.functions.math.Round(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('weight'), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)), '*', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)))), models.DecimalField(decimal_places=4, max_digits=12)), 2), models.FloatField()), 25), then=models.Value('healthy')), models.When(django.db.models.lookups.LessThan(django.db.models.functions.comparison.Cast(django.db.models.functions.math.Round(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('weight'), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)), '*', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)))), models.DecimalField(decimal_places=4, max_digits=12)), 2), models.FloatField()), 30), then=models.Value('overweight')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.functions.comparison.Cast(django.db.models.functions.math.Round(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('weight'), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)), '*', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.NullIf(models.F('height'), 0), '*', models.Value(0.0254)))), models.DecimalField(decimal_places=4, max_digits=12)), 2), models.FloatField()), 30), then=models.Value('obese')), default=None, output_field=models.CharField(max_length=20)), output_field=models.CharField(blank=True, choices=[('underweight', 'Underweight'), ('healthy', 'Healthy'), ('overweight', 'Overweight'), ('obese', 'Obese')], max_length=20, null=True), verbose_name='BMI Category'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:35
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_generated_bmi'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='studenttestresult',
+            options={'ordering': ['student', 'test', '-test_date'], 'verbose_name': 'Test Result', 'verbose_name_plural': 'Test Results'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='studenttestresult',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='test_date',
+            field=models.DateField(default=datetime.date.today, verbose_name='Assessment Date'),
+        ),
+        migrations.AddField(
+            model_name='studenttestresult',
+            name='term',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Term'),
+        ),
+        migrations.AddField(
+            model_name='studenttestresult',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='studenttestresult',
+            name='test_date',
+            field=models.DateField(default=datetime.date.today, verbose_name='Test Date'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studenttestresult',
+            unique_together={('student', 'test', 'test_date')},
+        ),
+        migrations.AddIndex(
+            model_name='studenttestresult',
+            index=models.Index(fields=['student', 'test', '-test_date'], name='result_student_test_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studenttestresult',
+            index=models.Index(fields=['test', '-test_date'], name='result_test_date_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+# Timed tests and fall counts created by earlier imports rank lower scores higher
+LOWER_IS_BETTER_TESTS = ['Flamingo Balance', 'Plate Tapping']
+
+
+def set_test_direction(apps, schema_editor):
+    PhysicalTest = apps.get_model('students', 'PhysicalTest')
+    PhysicalTest.objects.filter(name__in=LOWER_IS_BETTER_TESTS).update(lower_is_better=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_result_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='physicaltest',
+            name='lower_is_better',
+            field=models.BooleanField(default=False, verbose_name='Lower Score Is Better'),
+        ),
+        migrations.RunPython(set_test_direction, migrations.RunPython.noop),
+    ]
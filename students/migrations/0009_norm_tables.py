@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0001_initial'),
+        ('students', '0008_test_direction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NormTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(choices=[('KG', 'Kindergarten'), ('1', 'Grade 1'), ('2', 'Grade 2'), ('3', 'Grade 3'), ('4', 'Grade 4'), ('5', 'Grade 5'), ('6', 'Grade 6'), ('7', 'Grade 7'), ('8', 'Grade 8'), ('9', 'Grade 9'), ('10', 'Grade 10')], max_length=10, verbose_name='Grade')),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female')], max_length=1, verbose_name='Gender')),
+                ('quantiles', models.JSONField(verbose_name='Score Quantiles')),
+                ('sample_size', models.IntegerField(verbose_name='Sample Size')),
+                ('built_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Built At')),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='norm_tables', to='schools.school', verbose_name='School')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='norm_tables', to='students.physicaltest', verbose_name='Test')),
+            ],
+            options={
+                'verbose_name': 'Norm Table',
+                'verbose_name_plural': 'Norm Tables',
+                'ordering': ['test', 'grade', 'gender'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('school__isnull', True)), fields=('test', 'grade', 'gender'), name='unique_district_norm'), models.UniqueConstraint(condition=models.Q(('school__isnull', False)), fields=('test', 'grade', 'gender', 'school'), name='unique_school_norm')],
+            },
+        ),
+    ]
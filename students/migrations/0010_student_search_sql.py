@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# The SQL is frozen here as it was when this migration was written, later
+# changes to students.search do not apply to databases migrated already.
+# The SQLite triggers keeping the index in sync are not created here: a
+# later migration in the same run may rebuild a table they name, which
+# SQLite refuses. StudentsConfig adds them, and loads the index, once every
+# migration has run.
+
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS students_student_fts USING fts5(
+        name, roll_number, school_name, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS students_student_fts_insert',
+    'DROP TRIGGER IF EXISTS students_student_fts_update',
+    'DROP TRIGGER IF EXISTS students_student_fts_delete',
+    'DROP TRIGGER IF EXISTS students_school_fts_rename',
+    'DROP TABLE IF EXISTS students_student_fts',
+]
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS students_student_name_trgm '
+    'ON students_student USING gin (UPPER(name::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS students_student_roll_trgm '
+    'ON students_student USING gin (UPPER(roll_number::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS schools_school_name_trgm '
+    'ON schools_school USING gin (UPPER(name::text) gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS schools_school_name_trgm',
+    'DROP INDEX IF EXISTS students_student_roll_trgm',
+    'DROP INDEX IF EXISTS students_student_name_trgm',
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any('ENABLE_FTS5' in row[0] for row in cursor.fetchall())
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL applied only on one database vendor, the search index differs per vendor"""
+
+    def __init__(self, vendor, sql, reverse_sql):
+        self.vendor = vendor
+        super().__init__(sql, reverse_sql)
+
+    def applies_to(self, connection):
+        if connection.vendor != self.vendor:
+            return False
+        return self.vendor != 'sqlite' or has_fts5(connection)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if self.applies_to(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if self.applies_to(schema_editor.connection):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0002_class_updated_at'),
+        ('students', '0009_norm_tables'),
+    ]
+
+    operations = [
+        VendorRunSQL('sqlite', SQLITE_INSTALL, SQLITE_UNINSTALL),
+        VendorRunSQL('postgresql', POSTGRES_INSTALL, POSTGRES_UNINSTALL),
+    ]
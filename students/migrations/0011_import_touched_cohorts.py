@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_student_search_sql'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='touched_cohorts',
+            field=models.JSONField(blank=True, default=list, verbose_name='Touched Cohorts'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_import_touched_cohorts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='physicaltest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,12 +1,20 @@
 from django.db import models
+from django.db.models import Case, F, Value, When, Window
+from django.db.models.functions import Cast, NullIf, Round, RowNumber
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
 from django.urls import reverse
+from django.utils import timezone
 from schools.models import School, Class
+from datetime import date
 import math
 
 class PhysicalTest(models.Model):
     name = models.CharField(max_length=100, verbose_name="Test Name")
     unit = models.CharField(max_length=20, verbose_name="Unit")
     description = models.TextField(blank=True, verbose_name="Description")
+    # e.g. falls or seconds, where a smaller score ranks higher
+    lower_is_better = models.BooleanField(default=False, verbose_name="Lower Score Is Better")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Physical Test"
@@ -16,6 +24,30 @@ class PhysicalTest(models.Model):
     def __str__(self):
         return f"{self.name} ({self.unit})"
 
+def _bmi_expression():
+    """weight / height², height converted from inches to meters, rounded to 2 decimals"""
+    height_m = NullIf(F('height'), 0) * Value(0.0254)
+    bmi = F('weight') / (height_m * height_m)
+    # Round through numeric, PostgreSQL has no ROUND(double precision, int)
+    return Cast(Round(Cast(bmi, models.DecimalField(max_digits=12, decimal_places=4)), 2), models.FloatField())
+
+
+def _bmi_category_expression():
+    # Generated columns cannot reference each other, so the BMI is repeated
+    bmi = _bmi_expression()
+    return Case(
+        When(LessThan(bmi, 18.5), then=Value('underweight')),
+        When(LessThan(bmi, 25), then=Value('healthy')),
+        When(LessThan(bmi, 30), then=Value('overweight')),
+        When(GreaterThanOrEqual(bmi, 30), then=Value('obese')),
+        default=None,
+        output_field=models.CharField(max_length=20),
+    )
+
+
+BMI_EXPRESSION = _bmi_expression()
+BMI_CATEGORY_EXPRESSION = _bmi_category_expression()
+
 class Student(models.Model):
     GENDER_CHOICES = [
         ('M', 'Male'),
@@ -37,16 +69,29 @@ class Student(models.Model):
     height = models.FloatField(verbose_name="Height (inches)")
     weight = models.FloatField(verbose_name="Weight (kg)")
 
-    # Calculated fields
+    # Calculated fields, BMI and its category are computed by the database
     age = models.IntegerField(blank=True, null=True, verbose_name="Age")
-    bmi = models.FloatField(blank=True, null=True, verbose_name="BMI")
-    bmi_category = models.CharField(max_length=20, choices=BMI_CATEGORIES, blank=True, verbose_name="BMI Category")
+    bmi = models.GeneratedField(
+        expression=BMI_EXPRESSION,
+        output_field=models.FloatField(blank=True, null=True),
+        db_persist=True,
+        verbose_name="BMI",
+    )
+    bmi_category = models.GeneratedField(
+        expression=BMI_CATEGORY_EXPRESSION,
+        output_field=models.CharField(max_length=20, choices=BMI_CATEGORIES, blank=True, null=True),
+        db_persist=True,
+        verbose_name="BMI Category",
+    )
 
     # Performance tracking
     percentile = models.CharField(max_length=50, blank=True, verbose_name="Percentile")
     performance_group = models.IntegerField(blank=True, null=True, verbose_name="Performance Group")
     overall_comment = models.TextField(blank=True, verbose_name="Overall Comment")
 
+    # Hash of the last imported sheet row, lets re-imports skip unchanged rows
+    import_fingerprint = models.CharField(max_length=64, blank=True, editable=False, verbose_name="Import Fingerprint")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -64,43 +109,186 @@ class Student(models.Model):
         today = date.today()
         return today.year - self.date_of_birth.year - ((today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day))
 
-    def calculate_bmi(self):
-        height_m = self.height * 0.0254  # Convert inches to meters
-        return round(self.weight / (height_m ** 2), 2)
-
-    def get_bmi_category(self):
-        bmi = self.calculate_bmi()
-        if bmi < 18.5:
-            return 'underweight'
-        elif bmi < 25:
-            return 'healthy'
-        elif bmi < 30:
-            return 'overweight'
-        else:
-            return 'obese'
+    def get_bmi_category_display(self):
+        # Generated fields do not get the get_FOO_display() of their output field
+        return dict(self.BMI_CATEGORIES).get(self.bmi_category, self.bmi_category)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_measures = instance._measures()
+        return instance
+
+    def _measures(self):
+        return self.__dict__.get('height'), self.__dict__.get('weight')
 
     def save(self, *args, **kwargs):
+        # bmi and bmi_category are generated columns, only age is set here
         self.age = self.calculate_age()
-        self.bmi = self.calculate_bmi()
-        self.bmi_category = self.get_bmi_category()
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        # Inserts return the generated columns, updates leave the old values
+        # on the instance, so they are reloaded when the measures changed
+        if not adding and self._measures() != getattr(self, '_saved_measures', None):
+            self.refresh_from_db(fields=['bmi', 'bmi_category'])
+        self._saved_measures = self._measures()
 
     def get_absolute_url(self):
         return reverse('students:detail', kwargs={'pk': self.pk})
 
+class StudentTestResultQuerySet(models.QuerySet):
+    """
+    Results are append-only, one row per assessment. These helpers rank each
+    student's results per test by assessment date with a window function,
+    which the (student, test, -test_date) index serves without a sort.
+    """
+
+    def with_recency(self):
+        return self.annotate(
+            recency=Window(
+                RowNumber(),
+                partition_by=[F('student_id'), F('test_id')],
+                order_by=[F('test_date').desc(), F('pk').desc()],
+            )
+        )
+
+    def latest_scores(self):
+        """The most recent result of every student for every test"""
+        return self.with_recency().filter(recency=1)
+
+    def trend(self, terms):
+        """The last `terms` results of every student for every test, newest first"""
+        return self.with_recency().filter(recency__lte=terms).order_by('student', 'test', '-test_date')
+
 class StudentTestResult(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='test_results')
     test = models.ForeignKey(PhysicalTest, on_delete=models.CASCADE)
     score = models.FloatField(verbose_name="Score")
     percentile = models.CharField(max_length=50, blank=True, verbose_name="Percentile")
     comment = models.TextField(blank=True, verbose_name="Comment")
-    test_date = models.DateField(auto_now_add=True, verbose_name="Test Date")
+    test_date = models.DateField(default=date.today, verbose_name="Test Date")
+    term = models.CharField(max_length=20, blank=True, verbose_name="Term")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StudentTestResultQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Test Result"
         verbose_name_plural = "Test Results"
-        unique_together = ['student', 'test']
-        ordering = ['student', 'test']
+        unique_together = ['student', 'test', 'test_date']
+        ordering = ['student', 'test', '-test_date']
+        indexes = [
+            models.Index(fields=['student', 'test', '-test_date'], name='result_student_test_date_idx'),
+            models.Index(fields=['test', '-test_date'], name='result_test_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.name} - {self.test.name}: {self.score} ({self.test_date})"
+
+class NormTable(models.Model):
+    """
+    Reference score distribution of a test for one cohort.
+
+    quantiles holds the cohort's scores at every percentile from 0 to 100,
+    so a new score is ranked with a binary search. District norms have no
+    school, per-school norms are used with STUDENT_PERCENTILE_SCOPE = 'school'.
+    """
+    test = models.ForeignKey(PhysicalTest, on_delete=models.CASCADE, related_name='norm_tables', verbose_name="Test")
+    grade = models.CharField(max_length=10, choices=Class.GRADE_CHOICES, verbose_name="Grade")
+    gender = models.CharField(max_length=1, choices=Student.GENDER_CHOICES, verbose_name="Gender")
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True, blank=True, related_name='norm_tables', verbose_name="School")
+    quantiles = models.JSONField(verbose_name="Score Quantiles")
+    sample_size = models.IntegerField(verbose_name="Sample Size")
+    built_at = models.DateTimeField(default=timezone.now, verbose_name="Built At")
+
+    class Meta:
+        verbose_name = "Norm Table"
+        verbose_name_plural = "Norm Tables"
+        ordering = ['test', 'grade', 'gender']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['test', 'grade', 'gender'],
+                condition=models.Q(school__isnull=True),
+                name='unique_district_norm',
+            ),
+            models.UniqueConstraint(
+                fields=['test', 'grade', 'gender', 'school'],
+                condition=models.Q(school__isnull=False),
+                name='unique_school_norm',
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.student.name} - {self.test.name}: {self.score}"
+        scope = self.school.name if self.school else 'District'
+        return f"{self.test.name} - Grade {self.grade} {self.get_gender_display()} ({scope})"
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    MODE_CHOICES = [
+        ('create', 'Add new students only'),
+        ('upsert', 'Add new students and update changed ones'),
+    ]
+
+    ON_ERROR_CHOICES = [
+        ('reject', 'Reject the whole file'),
+        ('quarantine', 'Skip invalid rows'),
+    ]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='import_jobs', verbose_name="School")
+    upload = models.FileField(upload_to='imports/', verbose_name="Uploaded File")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name="Status")
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='create', verbose_name="Mode")
+    on_error = models.CharField(max_length=20, choices=ON_ERROR_CHOICES, default='quarantine', verbose_name="On Invalid Rows")
+    dry_run = models.BooleanField(default=False, verbose_name="Dry Run")
+    test_date = models.DateField(default=date.today, verbose_name="Assessment Date")
+
+    # Whole-file validation, done before any row is written
+    validated = models.BooleanField(default=False, verbose_name="Validated")
+    invalid_rows = models.JSONField(default=list, blank=True, verbose_name="Invalid Rows")
+    error_report = models.FileField(upload_to='imports/errors/', blank=True, verbose_name="Error Report")
+
+    # Progress, committed together with each imported batch
+    total_rows = models.IntegerField(default=0, verbose_name="Total Rows")
+    rows_processed = models.IntegerField(default=0, verbose_name="Rows Processed")
+    imported_count = models.IntegerField(default=0, verbose_name="Students Imported")
+    updated_count = models.IntegerField(default=0, verbose_name="Students Updated")
+    unchanged_count = models.IntegerField(default=0, verbose_name="Rows Unchanged")
+    row_errors = models.JSONField(default=list, blank=True, verbose_name="Row Errors")
+    # (test, grade, gender, school) cohorts given scores by the committed
+    # batches, their percentiles are recomputed when the job finishes
+    touched_cohorts = models.JSONField(default=list, blank=True, verbose_name="Touched Cohorts")
+    error_message = models.TextField(blank=True, verbose_name="Error")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Import #{self.pk} - {self.school.name} ({self.status})"
+
+    def get_absolute_url(self):
+        return reverse('students:import_job', kwargs={'pk': self.pk})
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    @property
+    def duration(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
@@ -0,0 +1,177 @@
+import json
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from schools.models import School
+from .models import NormTable, PhysicalTest
+from .percentiles import cohort_columns, cohort_for_group, cohort_key, latest_results, per_school
+
+# Scores are stored at every whole percentile, 101 points per table
+NORM_POINTS = np.linspace(0, 100, 101)
+
+# Cohorts with fewer scores than this get no table and keep being ranked
+# against the live population
+NORM_MIN_SAMPLE_SIZE = 30
+
+EXPORT_FORMAT_VERSION = 1
+
+_cache = {'tables': None, 'loaded_at': 0.0}
+
+
+def cache_seconds():
+    return getattr(settings, 'STUDENT_NORM_CACHE_SECONDS', 300)
+
+
+def clear_norm_cache():
+    _cache['tables'] = None
+
+
+def get_norm_tables():
+    """
+    Norm tables of the current percentile scope, keyed by cohort.
+
+    Loaded once and kept in process for STUDENT_NORM_CACHE_SECONDS, so
+    workers pick up tables rebuilt by another process after that delay.
+    """
+    if _cache['tables'] is None or time.monotonic() - _cache['loaded_at'] > cache_seconds():
+        tables = NormTable.objects.filter(school__isnull=not per_school()).select_related('test')
+        _cache['tables'] = {
+            cohort_key(table.test_id, table.grade, table.gender, table.school_id):
+                (table.quantiles, table.test.lower_is_better)
+            for table in tables
+        }
+        _cache['loaded_at'] = time.monotonic()
+    return _cache['tables']
+
+
+def norm_percentile(quantiles, score, lower_is_better=False):
+    """Percentile of one score against a norm table, two binary searches over its quantiles"""
+    position = (bisect_left(quantiles, score) + bisect_right(quantiles, score)) / 2
+    percentile = position / len(quantiles) * 100
+    return 100 - percentile if lower_is_better else percentile
+
+
+def norm_percentiles(quantiles, scores, lower_is_better=False):
+    """norm_percentile() of a whole array of scores"""
+    quantiles = np.asarray(quantiles)
+    position = (np.searchsorted(quantiles, scores, side='left') + np.searchsorted(quantiles, scores, side='right')) / 2
+    percentiles = position / len(quantiles) * 100
+    return 100 - percentiles if lower_is_better else percentiles
+
+
+def has_norm_table(cohort):
+    return cohort_key(*cohort) in get_norm_tables()
+
+
+def lookup_percentile(test_id, grade, gender, school_id, score):
+    """Percentile of a score from its cohort's norm table, None if the cohort has none"""
+    table = get_norm_tables().get(cohort_key(test_id, grade, gender, school_id))
+    if table is None:
+        return None
+    quantiles, lower_is_better = table
+    return norm_percentile(quantiles, score, lower_is_better)
+
+
+def build_norm_tables(min_sample_size=NORM_MIN_SAMPLE_SIZE):
+    """
+    Rebuild the norm tables of the current scope from the latest scores.
+
+    Each cohort's scores are reduced to their quantiles at NORM_POINTS.
+    Tables of cohorts that no longer reach min_sample_size are removed.
+    Returns the number of tables built.
+    """
+    df = latest_results()
+    now = timezone.now()
+    tables = []
+    for key, scores in df.groupby(cohort_columns(), sort=False)['score']:
+        if len(scores) < min_sample_size:
+            continue
+        test_id, grade, gender, school_id = cohort_for_group(key)
+        tables.append(NormTable(
+            test_id=test_id,
+            grade=grade,
+            gender=gender,
+            school_id=school_id,
+            quantiles=np.quantile(scores.to_numpy(), NORM_POINTS / 100).round(4).tolist(),
+            sample_size=len(scores),
+            built_at=now,
+        ))
+
+    with transaction.atomic():
+        NormTable.objects.filter(school__isnull=not per_school()).delete()
+        NormTable.objects.bulk_create(tables, batch_size=500)
+    clear_norm_cache()
+    return len(tables)
+
+
+def export_norm_tables(handle):
+    """Write every norm table as JSON, tests and schools referred to by name"""
+    tables = NormTable.objects.select_related('test', 'school')
+    json.dump({
+        'version': EXPORT_FORMAT_VERSION,
+        'tables': [
+            {
+                'test': table.test.name,
+                'unit': table.test.unit,
+                'lower_is_better': table.test.lower_is_better,
+                'grade': table.grade,
+                'gender': table.gender,
+                'school': table.school.name if table.school else None,
+                'quantiles': table.quantiles,
+                'sample_size': table.sample_size,
+                'built_at': table.built_at.isoformat(),
+            }
+            for table in tables
+        ],
+    }, handle, indent=2)
+    return len(tables)
+
+
+def import_norm_tables(handle):
+    """
+    Load norm tables exported by another deployment.
+
+    Tables replace the local ones of the same cohort. Missing tests are
+    created, tables of schools unknown here are skipped. Returns
+    (tables imported, tables skipped).
+    """
+    data = json.load(handle)
+    if data.get('version') != EXPORT_FORMAT_VERSION:
+        raise ValueError(f'Unsupported norm table export version: {data.get("version")}')
+
+    tests = {test.name: test for test in PhysicalTest.objects.all()}
+    schools = dict(School.objects.values_list('name', 'pk'))
+    imported = skipped = 0
+    with transaction.atomic():
+        for entry in data['tables']:
+            school_id = None
+            if entry['school'] is not None:
+                school_id = schools.get(entry['school'])
+                if school_id is None:
+                    skipped += 1
+                    continue
+            test = tests.get(entry['test'])
+            if test is None:
+                test = tests[entry['test']] = PhysicalTest.objects.create(
+                    name=entry['test'], unit=entry['unit'], lower_is_better=entry['lower_is_better']
+                )
+            NormTable.objects.filter(
+                test=test, grade=entry['grade'], gender=entry['gender'], school_id=school_id
+            ).delete()
+            NormTable.objects.create(
+                test=test,
+                grade=entry['grade'],
+                gender=entry['gender'],
+                school_id=school_id,
+                quantiles=entry['quantiles'],
+                sample_size=entry['sample_size'],
+                built_at=entry['built_at'],
+            )
+            imported += 1
+    clear_norm_cache()
+    return imported, skipped
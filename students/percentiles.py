@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .models import Student, PhysicalTest, StudentTestResult
+from .services import update_by_value
+
+# Percentiles rank a student's latest score against the other students of the
+# same test, grade and gender. STUDENT_PERCENTILE_SCOPE = 'school' narrows the
+# cohorts to a single school, the default 'district' ranks across all schools.
+COHORT_COLUMNS = ['test_id', 'grade', 'gender', 'school_id']
+
+RESULT_FIELDS = [
+    'pk', 'student_id', 'test_id', 'score', 'percentile',
+    'student__class_assigned__grade', 'student__gender', 'student__class_assigned__school_id',
+]
+RESULT_COLUMNS = ['pk', 'student_id', 'test_id', 'score', 'percentile', 'grade', 'gender', 'school_id']
+
+STUDENT_CHUNK_SIZE = 5000
+
+
+def per_school():
+    return getattr(settings, 'STUDENT_PERCENTILE_SCOPE', 'district') == 'school'
+
+
+def cohort_columns():
+    """DataFrame columns that make up a cohort in the current scope"""
+    return COHORT_COLUMNS if per_school() else COHORT_COLUMNS[:3]
+
+
+def cohort_for_group(key):
+    """Cohort tuple of a groupby key over cohort_columns()"""
+    return tuple(key) if per_school() else (*key, None)
+
+
+def cohort_key(test_id, grade, gender, school_id):
+    """Cohort of a score, the school only counts when percentiles are per school"""
+    return (test_id, grade, gender, school_id if per_school() else None)
+
+
+def rank_percentiles(scores, lower_is_better=False):
+    """
+    Percentile of every score within the array, from 0 to 100.
+
+    Each score counts the scores below it plus half of the ties (mid-rank),
+    found with two binary searches over the sorted cohort. Scores are
+    negated for tests where lower is better.
+    """
+    values = -scores if lower_is_better else scores
+    ordered = np.sort(values)
+    below = np.searchsorted(ordered, values, side='left')
+    not_above = np.searchsorted(ordered, values, side='right')
+    return (below + not_above) / 2 / len(values) * 100
+
+
+def format_percentile(value):
+    return str(int(round(value)))
+
+
+def cohorts_for_students(student_ids):
+    """Cohorts of every test result of the given students"""
+    return {
+        cohort_key(*row)
+        for row in StudentTestResult.objects.filter(student_id__in=student_ids).values_list(
+            'test_id', 'student__class_assigned__grade', 'student__gender', 'student__class_assigned__school_id'
+        ).distinct()
+    }
+
+
+def latest_results(cohorts=None):
+    """Latest result of every student in the given cohorts as a DataFrame"""
+    results = StudentTestResult.objects.latest_scores()
+    if cohorts is not None:
+        cohorts = {cohort_key(*cohort) for cohort in cohorts}
+        # Narrow the query column by column, exact cohorts are picked below
+        results = results.filter(
+            test_id__in={cohort[0] for cohort in cohorts},
+            student__class_assigned__grade__in={cohort[1] for cohort in cohorts},
+            student__gender__in={cohort[2] for cohort in cohorts},
+        )
+        if per_school():
+            results = results.filter(student__class_assigned__school_id__in={cohort[3] for cohort in cohorts})
+
+    df = pd.DataFrame(list(results.values_list(*RESULT_FIELDS)), columns=RESULT_COLUMNS)
+    if not per_school():
+        df['school_id'] = None
+    if cohorts is not None and not df.empty:
+        keys = pd.MultiIndex.from_frame(df[COHORT_COLUMNS].astype(object))
+        df = df[keys.isin(list(cohorts))]
+    return df
+
+
+def recompute_percentiles(cohorts=None):
+    """
+    Rank the latest scores of the given cohorts, or of every cohort.
+
+    cohorts are (test_id, grade, gender, school_id) tuples, as collected by
+    the importer or cohorts_for_students(). Cohorts with a norm table are
+    looked up in it, the others are ranked against each other with
+    rank_percentiles(). Then the overall percentile of every student in
+    those cohorts is refreshed as the mean over their tests. Only values
+    that changed are written. Returns (results updated, students updated).
+    """
+    df = latest_results(cohorts)
+    if df.empty:
+        return 0, 0
+
+    from .norms import get_norm_tables, norm_percentiles
+
+    norm_tables = get_norm_tables()
+    lower_is_better = dict(PhysicalTest.objects.values_list('pk', 'lower_is_better'))
+    scores = df['score'].to_numpy()
+    ranked = np.empty(len(df))
+    for key, positions in df.groupby(cohort_columns(), sort=False).indices.items():
+        table = norm_tables.get(cohort_for_group(key))
+        if table is not None:
+            ranked[positions] = norm_percentiles(table[0], scores[positions], table[1])
+        else:
+            ranked[positions] = rank_percentiles(scores[positions], lower_is_better.get(key[0], False))
+    df['new_percentile'] = [format_percentile(value) for value in ranked]
+
+    changed = df[df['new_percentile'] != df['percentile']]
+    with transaction.atomic():
+        update_by_value(StudentTestResult, 'percentile', changed['pk'], changed['new_percentile'])
+        students_updated = recompute_overall_percentiles(df['student_id'].unique().tolist())
+    return len(changed), students_updated
+
+
+def recompute_overall_percentiles(student_ids):
+    """Overall percentile of each student, the mean of their latest test percentiles"""
+    updated = 0
+    for start in range(0, len(student_ids), STUDENT_CHUNK_SIZE):
+        chunk = student_ids[start:start + STUDENT_CHUNK_SIZE]
+        latest = pd.DataFrame(
+            list(StudentTestResult.objects.latest_scores().filter(student_id__in=chunk)
+                 .values_list('student_id', 'percentile')),
+            columns=['student_id', 'percentile'],
+        )
+        overall = pd.to_numeric(latest['percentile'], errors='coerce').groupby(latest['student_id']).mean().dropna()
+        current = dict(Student.objects.filter(pk__in=chunk).order_by().values_list('pk', 'percentile'))
+        overall = overall.map(format_percentile)
+        changed = overall[overall != overall.index.map(current)]
+        update_by_value(Student, 'percentile', changed.index, changed)
+        updated += len(changed)
+    return updated
@@ -0,0 +1,154 @@
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+SUPPORTED_EXTENSIONS = ['.xlsx', '.csv']
+
+
+def roll_numbers_as_text(frame):
+    """
+    Turn the Roll column of a batch into stripped text, in place.
+
+    Roll numbers typed as numbers come back from .xlsx as 11 or 11.0, they
+    are given the text a .csv of the same sheet is read as. Validation and
+    the importer both use the rolls as read here. Missing cells are left
+    missing.
+    """
+    if 'Roll' in frame:
+        rolls = frame['Roll']
+        present = rolls.notna()
+        frame.loc[present, 'Roll'] = rolls[present].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return frame
+
+
+class SheetReader:
+    """
+    Lazily reads an uploaded .xlsx or .csv sheet in fixed-size batches.
+
+    Only the header and the current batch are held in memory, so peak memory
+    does not depend on the size of the file. Each batch is a DataFrame whose
+    index is the 0-based row position in the sheet, so index + 2 is the row
+    number a spreadsheet shows. Blank rows are counted in that position
+    but left out of the batches.
+
+    A reader given a path opens the file itself, use it as a context manager
+    or call close() so the file is closed again. Uploaded file objects are
+    left open for their owner.
+    """
+
+    def __init__(self, upload, batch_size=1000):
+        self.owns_upload = isinstance(upload, (str, os.PathLike))
+        if self.owns_upload:
+            upload = open(upload, 'rb')
+        self.upload = upload
+        self.batch_size = batch_size
+        try:
+            name = getattr(upload, 'name', None) or ''
+            self.extension = os.path.splitext(str(name))[1].lower()
+            if self.extension not in SUPPORTED_EXTENSIONS:
+                raise ValueError(f'Unsupported file type "{self.extension}", expected one of: {", ".join(SUPPORTED_EXTENSIONS)}')
+            self.columns = self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.owns_upload:
+            self.upload.close()
+
+    def _rewind(self):
+        if hasattr(self.upload, 'seek'):
+            self.upload.seek(0)
+
+    def _read_header(self):
+        self._rewind()
+        if self.extension == '.csv':
+            return list(pd.read_csv(self.upload, nrows=0).columns)
+        workbook = load_workbook(self.upload, read_only=True, data_only=True)
+        try:
+            header = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return [
+            str(value) if value is not None else f'Unnamed: {i}'
+            for i, value in enumerate(header)
+        ]
+
+    def count_rows(self):
+        """Cheap estimate of the number of data rows, used for progress reporting"""
+        self._rewind()
+        if self.extension == '.csv':
+            lines = 0
+            for block in iter(lambda: self.upload.read(1 << 20), b''):
+                lines += block.count(b'\n')
+            return max(lines - 1, 0)
+        workbook = load_workbook(self.upload, read_only=True, data_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+
+    def batches(self, start=0):
+        """Yield DataFrames of at most batch_size rows, after the first `start` non-blank rows"""
+        self._rewind()
+        if self.extension == '.csv':
+            yield from self._csv_batches(start)
+        else:
+            yield from self._xlsx_batches(start)
+
+    def _csv_batches(self, start):
+        # Keep every cell as text so roll numbers like "001" survive, and
+        # blank lines so rows are numbered as a spreadsheet shows them
+        reader = pd.read_csv(self.upload, dtype=str, chunksize=self.batch_size, skip_blank_lines=False)
+        offset = 0
+        skipped = 0
+        for chunk in reader:
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            chunk = chunk.dropna(how='all')
+            # Rows before start are parsed and dropped rather than skipped
+            # as lines, quoted cells may span lines
+            if skipped < start:
+                drop = min(start - skipped, len(chunk))
+                skipped += drop
+                chunk = chunk.iloc[drop:].copy()
+            if len(chunk):
+                yield roll_numbers_as_text(chunk)
+
+    def _xlsx_batches(self, start):
+        workbook = load_workbook(self.upload, read_only=True, data_only=True)
+        try:
+            width = len(self.columns)
+            rows = []
+            positions = []
+            skipped = 0
+            for position, values in enumerate(workbook.active.iter_rows(min_row=2, values_only=True)):
+                values = tuple(values[:width]) + (None,) * (width - len(values))
+                if all(value is None for value in values):
+                    continue
+                if skipped < start:
+                    skipped += 1
+                    continue
+                rows.append(values)
+                positions.append(position)
+                if len(rows) == self.batch_size:
+                    yield self._frame(rows, positions)
+                    rows = []
+                    positions = []
+            if rows:
+                yield self._frame(rows, positions)
+        finally:
+            workbook.close()
+
+    def _frame(self, rows, positions):
+        # object keeps each cell as read, a missing cell would otherwise
+        # turn a column of whole numbers into floats
+        frame = pd.DataFrame(rows, columns=self.columns, index=pd.Index(positions), dtype=object)
+        return roll_numbers_as_text(frame)
@@ -0,0 +1,265 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Q, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from schools.models import School
+from .models import Student
+
+FTS_TABLE = 'students_student_fts'
+
+# The FTS table is maintained by triggers, so bulk_create, QuerySet.update()
+# and cascading deletes keep it in sync without any Python involvement. The
+# table is created by migration 0010_student_search_sql. The triggers' bodies
+# name the student and school tables, which SQLite refuses to rebuild while
+# they exist, so they are dropped around migrations of those apps and added
+# back once they are applied, see StudentsConfig.
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, roll_number, school_name, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS students_student_fts_insert AFTER INSERT ON students_student BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, roll_number, school_name)
+        SELECT NEW.id, NEW.name, NEW.roll_number, s.name
+        FROM schools_class c JOIN schools_school s ON s.id = c.school_id
+        WHERE c.id = NEW.class_assigned_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS students_student_fts_update
+        AFTER UPDATE OF name, roll_number, class_assigned_id ON students_student BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+        INSERT INTO {FTS_TABLE} (rowid, name, roll_number, school_name)
+        SELECT NEW.id, NEW.name, NEW.roll_number, s.name
+        FROM schools_class c JOIN schools_school s ON s.id = c.school_id
+        WHERE c.id = NEW.class_assigned_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS students_student_fts_delete AFTER DELETE ON students_student BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS students_school_fts_rename AFTER UPDATE OF name ON schools_school BEGIN
+        UPDATE {FTS_TABLE} SET school_name = NEW.name
+        WHERE rowid IN (
+            SELECT st.id FROM students_student st
+            JOIN schools_class c ON c.id = st.class_assigned_id
+            WHERE c.school_id = NEW.id
+        );
+    END""",
+]
+
+SQLITE_TRIGGERS = [
+    'students_student_fts_insert',
+    'students_student_fts_update',
+    'students_student_fts_delete',
+    'students_school_fts_rename',
+]
+
+SQLITE_DROP_TRIGGERS = [f'DROP TRIGGER IF EXISTS {name}' for name in SQLITE_TRIGGERS]
+
+SQLITE_UNINSTALL = SQLITE_DROP_TRIGGERS + [
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+SQLITE_REBUILD = [
+    f'DELETE FROM {FTS_TABLE}',
+    f"""INSERT INTO {FTS_TABLE} (rowid, name, roll_number, school_name)
+        SELECT st.id, st.name, st.roll_number, s.name
+        FROM students_student st
+        JOIN schools_class c ON c.id = st.class_assigned_id
+        JOIN schools_school s ON s.id = c.school_id""",
+]
+
+# Trigram indexes matching the UPPER(col::text) LIKE UPPER(...) that Django
+# generates for icontains, so substring searches no longer scan the table
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS students_student_name_trgm '
+    'ON students_student USING gin (UPPER(name::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS students_student_roll_trgm '
+    'ON students_student USING gin (UPPER(roll_number::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS schools_school_name_trgm '
+    'ON schools_school USING gin (UPPER(name::text) gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS schools_school_name_trgm',
+    'DROP INDEX IF EXISTS students_student_roll_trgm',
+    'DROP INDEX IF EXISTS students_student_name_trgm',
+]
+
+
+class LikeSearchBackend:
+    """Unindexed icontains search, used when no index is available"""
+
+    def filter(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(roll_number__icontains=query) |
+            Q(class_assigned__school__name__icontains=query)
+        )
+
+    def top_matches(self, query, limit):
+        return self.filter(Student.objects.all(), query)[:limit]
+
+    def install(self, db_connection):
+        pass
+
+    def uninstall(self, db_connection):
+        pass
+
+    def is_installed(self, db_connection):
+        return True
+
+    def suspend(self, db_connection):
+        """Get the index out of the way of the schema changes of a migrate run"""
+
+    def resume(self, db_connection):
+        """Restore what suspend() removed, once migrations are applied"""
+
+
+class PostgresTrigramSearchBackend(LikeSearchBackend):
+    """
+    icontains search backed by pg_trgm GIN indexes.
+
+    School names are matched in a subquery against the small schools table,
+    so the planner can combine the student indexes with a bitmap OR instead
+    of scanning the join.
+    """
+
+    def filter(self, queryset, query):
+        schools = School.objects.filter(name__icontains=query).values('pk')
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(roll_number__icontains=query) |
+            Q(class_assigned__school__in=schools)
+        )
+
+    def install(self, db_connection):
+        with db_connection.cursor() as cursor:
+            for statement in POSTGRES_INSTALL:
+                cursor.execute(statement)
+
+    def uninstall(self, db_connection):
+        with db_connection.cursor() as cursor:
+            for statement in POSTGRES_UNINSTALL:
+                cursor.execute(statement)
+
+    def is_installed(self, db_connection):
+        with db_connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'students_student_name_trgm'")
+            return cursor.fetchone() is not None
+
+
+class SQLiteFTSSearchBackend(LikeSearchBackend):
+    """
+    Prefix search over an FTS5 index of student name, roll number and school.
+
+    Every word of the query must match the start of a word in one of the
+    indexed columns, ranked by bm25 for typeahead results.
+    """
+
+    def match_expression(self, query):
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def filter(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression])
+        )
+
+    def top_matches(self, query, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return Student.objects.none()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [expression, limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)])
+        return Student.objects.filter(pk__in=ids).order_by(ranking) if ids else Student.objects.none()
+
+    def install(self, db_connection):
+        """Create the index and its triggers, then load every student into it"""
+        with db_connection.cursor() as cursor:
+            for statement in SQLITE_INSTALL + SQLITE_REBUILD:
+                cursor.execute(statement)
+
+    def uninstall(self, db_connection):
+        with db_connection.cursor() as cursor:
+            for statement in SQLITE_UNINSTALL:
+                cursor.execute(statement)
+
+    def is_installed(self, db_connection):
+        with db_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s, %s)",
+                SQLITE_TRIGGERS,
+            )
+            return cursor.fetchone()[0] == len(SQLITE_TRIGGERS)
+
+    def has_index_table(self, db_connection):
+        with db_connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            return cursor.fetchone() is not None
+
+    def suspend(self, db_connection):
+        """Drop the triggers, SQLite cannot rebuild a table named in a trigger body"""
+        with db_connection.cursor() as cursor:
+            for statement in SQLITE_DROP_TRIGGERS:
+                cursor.execute(statement)
+
+    def resume(self, db_connection):
+        """
+        Recreate the triggers and reload the index.
+
+        Only once the index migration has created the FTS table: before
+        that the student table may not exist yet, or may still be rebuilt.
+        """
+        if self.has_index_table(db_connection) and not self.is_installed(db_connection):
+            self.install(db_connection)
+
+
+def sqlite_has_fts5(db_connection):
+    with db_connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any('ENABLE_FTS5' in row[0] for row in cursor.fetchall())
+
+
+def backend_for(db_connection):
+    path = getattr(settings, 'STUDENT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if db_connection.vendor == 'postgresql':
+        return PostgresTrigramSearchBackend()
+    if db_connection.vendor == 'sqlite' and sqlite_has_fts5(db_connection):
+        return SQLiteFTSSearchBackend()
+    return LikeSearchBackend()
+
+
+_backend = None
+
+
+def get_search_backend():
+    """The search backend for the default database, chosen once per process"""
+    global _backend
+    if _backend is None:
+        _backend = backend_for(connection)
+    return _backend
+
+
+def search_students(queryset, query):
+    return get_search_backend().filter(queryset, query)
+
+
+def suspend_search_index(db_connection):
+    backend_for(db_connection).suspend(db_connection)
+
+
+def resume_search_index(db_connection):
+    backend_for(db_connection).resume(db_connection)
@@ -0,0 +1,113 @@
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from .models import Student
+
+RECOMPUTE_CHUNK_SIZE = 50000
+UPDATE_BATCH_SIZE = 5000
+
+
+def compute_ages(dob_days, today):
+    """Ages in whole years from birth dates given as datetime64[D]"""
+    years = dob_days.astype('datetime64[Y]')
+    dob_year = years.astype(int) + 1970
+    dob_month = (dob_days.astype('datetime64[M]') - years.astype('datetime64[M]')).astype(int) + 1
+    dob_day = (dob_days - dob_days.astype('datetime64[M]').astype('datetime64[D]')).astype(int) + 1
+    before_birthday = (today.month < dob_month) | ((today.month == dob_month) & (today.day < dob_day))
+    return today.year - dob_year - before_birthday.astype(int)
+
+
+def update_by_value(model, field, pks, values, batch_size=UPDATE_BATCH_SIZE):
+    """
+    Write one field of many rows with one UPDATE per distinct value.
+
+    Meant for fields with few distinct values (percentiles, cluster labels):
+    rows are grouped by value and written with pk__in updates, instead of
+    bulk_update's per-row CASE expression.
+    """
+    pks = np.asarray(pks)
+    values = np.asarray(values)
+    for value in np.unique(values):
+        ids = pks[values == value].tolist()
+        value = value.item() if hasattr(value, 'item') else value
+        for start in range(0, len(ids), batch_size):
+            model.objects.filter(pk__in=ids[start:start + batch_size]).update(**{field: value})
+
+
+@contextmanager
+def keep_alive(beat, interval):
+    """
+    Call beat() every `interval` seconds from a background thread while the block runs.
+
+    Used by the job workers to refresh a job's heartbeat through long steps
+    that commit nothing, so the stale job sweep leaves it alone. A beat
+    failing, e.g. on SQLite while the job itself holds the write lock, is
+    retried at the next interval.
+    """
+    stop = threading.Event()
+
+    def run():
+        try:
+            while not stop.wait(interval):
+                try:
+                    beat()
+                except DatabaseError:
+                    pass
+        finally:
+            # Database connections are per thread, close this one's
+            connections.close_all()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def recompute_derived_fields(queryset=None, chunk_size=RECOMPUTE_CHUNK_SIZE, today=None):
+    """
+    Recompute the age of many students at once.
+
+    BMI and BMI category are generated columns kept current by the database,
+    only the age drifts as birthdays pass. Students are read in primary-key
+    order, chunk by chunk, as plain column values into NumPy arrays. Ages are
+    computed vectorized and only rows whose stored age differs are written
+    back with bulk_update. Returns (students checked, students updated).
+    """
+    queryset = Student.objects.all() if queryset is None else queryset
+    today = today or date.today()
+    checked = updated = 0
+    last_pk = 0
+
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'date_of_birth', 'age')[:chunk_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        checked += len(rows)
+
+        pks, dobs, ages = zip(*rows)
+        new_ages = compute_ages(np.array(dobs, dtype='datetime64[D]'), today)
+        old_ages = np.array([-1 if age is None else age for age in ages])
+        changed = np.flatnonzero(old_ages != new_ages)
+        if not len(changed):
+            continue
+
+        now = timezone.now()
+        students = [Student(pk=pks[i], age=int(new_ages[i]), updated_at=now) for i in changed]
+        with transaction.atomic():
+            Student.objects.bulk_update(students, ['age', 'updated_at'], batch_size=1000)
+        updated += len(students)
+
+    return checked, updated
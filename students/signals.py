@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Student
+from .norms import has_norm_table, lookup_percentile
+from .percentiles import (
+    cohort_key, cohorts_for_students, format_percentile, recompute_overall_percentiles, recompute_percentiles,
+)
+
+
+# Sent by StudentImporter once a run has written its students, with the
+# school and the student_ids created or updated
+students_imported = Signal()
+
+
+def _recompute_on_commit(cohorts):
+    if cohorts:
+        transaction.on_commit(lambda: recompute_percentiles(cohorts))
+
+
+def _result_cohort(result):
+    student = result.student
+    return (result.test_id, student.class_assigned.grade, student.gender, student.class_assigned.school_id)
+
+
+def result_pre_save(sender, instance, **kwargs):
+    """Look the percentile of a saved result up in its cohort's norm table"""
+    percentile = lookup_percentile(*_result_cohort(instance), instance.score)
+    if percentile is not None:
+        instance.percentile = format_percentile(percentile)
+
+
+def result_changed(sender, instance, **kwargs):
+    """
+    A result was saved.
+
+    With a norm table only the student's overall percentile needs a
+    refresh, otherwise the whole cohort is re-ranked.
+    """
+    cohort = _result_cohort(instance)
+    if has_norm_table(cohort):
+        student_id = instance.student_id
+        transaction.on_commit(lambda: recompute_overall_percentiles([student_id]))
+    else:
+        _recompute_on_commit({cohort_key(*cohort)})
+
+
+def _recompute_deleted_on_commit(deleted):
+    """Refresh the cohorts of deleted (student_id, test_id) results, looked up in one query"""
+    students = {
+        pk: cohort
+        for pk, *cohort in Student.objects.filter(pk__in={student_id for student_id, _ in deleted})
+        .values_list('pk', 'class_assigned__grade', 'gender', 'class_assigned__school_id')
+    }
+    cohorts = set()
+    for student_id, test_id in deleted:
+        if student_id in students:
+            cohort = (test_id, *students[student_id])
+            if not has_norm_table(cohort):
+                cohorts.add(cohort_key(*cohort))
+    # The students lost a result, so their overall percentile changes even
+    # when they are no longer in any re-ranked cohort
+    student_ids = sorted({student_id for student_id, _ in deleted})
+
+    def recompute():
+        if cohorts:
+            recompute_percentiles(cohorts)
+        recompute_overall_percentiles(student_ids)
+    transaction.on_commit(recompute)
+
+
+def result_pre_delete(sender, instance, origin=None, **kwargs):
+    """Note a result about to be deleted on the delete() call it belongs to"""
+    if not hasattr(origin, '_deleted_results'):
+        origin._deleted_results = {}
+    origin._deleted_results[instance.pk] = (instance.student_id, instance.test_id)
+
+
+def result_deleted(sender, instance, origin=None, **kwargs):
+    """
+    A result was deleted.
+
+    Cascades, e.g. deleting a class, delete many results in one go: their
+    cohorts are refreshed once, on the first post_delete while the students
+    are still there, then the notes are dropped with the last result.
+    """
+    deleted = origin._deleted_results
+    if not getattr(origin, '_deleted_results_queued', False):
+        origin._deleted_results_queued = True
+        _recompute_deleted_on_commit(list(deleted.values()))
+    del deleted[instance.pk]
+    if not deleted:
+        del origin._deleted_results, origin._deleted_results_queued
+
+
+def student_pre_save(sender, instance, **kwargs):
+    """Remember the old cohorts of a student moving to another class or gender"""
+    if instance.pk is None:
+        return
+    old = sender.objects.filter(pk=instance.pk).values('class_assigned_id', 'gender').first()
+    if old and (old['class_assigned_id'], old['gender']) != (instance.class_assigned_id, instance.gender):
+        instance._previous_cohorts = cohorts_for_students([instance.pk])
+
+
+def student_post_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_cohorts', None)
+    if previous is not None:
+        del instance._previous_cohorts
+        _recompute_on_commit(previous | cohorts_for_students([instance.pk]))
@@ -9,5 +9,9 @@ urlpatterns = [
     path('create/', views.StudentCreateView.as_view(), name='create'),
     path('<int:pk>/update/', views.StudentUpdateView.as_view(), name='update'),
     path('import/', views.import_students, name='import'),
+    path('import/jobs/<int:pk>/', views.ImportJobDetailView.as_view(), name='import_job'),
+    path('import/jobs/<int:pk>/progress/', views.import_job_progress, name='import_job_progress'),
+    path('import/jobs/<int:pk>/errors/', views.import_job_errors, name='import_job_errors'),
     path('ajax/classes/', views.get_classes_by_school, name='get_classes_by_school'),
+    path('ajax/search/', views.search_typeahead, name='search_typeahead'),
 ]
@@ -0,0 +1,100 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from schools.models import Class
+
+GRADES = [value for value, _ in Class.GRADE_CHOICES]
+SECTIONS = [value for value, _ in Class.SECTION_CHOICES]
+
+# Plausible measurement ranges for school children
+HEIGHT_RANGE = (20, 90)   # inches
+WEIGHT_RANGE = (5, 200)   # kg
+
+ERROR_REPORT_HEADER = ['Row', 'Column', 'Value', 'Error']
+
+
+def normalize_frame(df):
+    """
+    Normalize the class keys of a batch in place.
+
+    Grades read from a numeric column come back as 5 or 5.0, and sections
+    may be typed in lowercase, so both are turned into the codes used by
+    Class.GRADE_CHOICES and Class.SECTION_CHOICES.
+    """
+    df['Class'] = df['Class'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True).str.upper()
+    df['Class'] = df['Class'].replace({'KINDERGARTEN': 'KG'})
+    df['Section'] = df['Section'].astype(str).str.strip().str.upper()
+    return df
+
+
+class SheetValidator:
+    """
+    Vectorized validation of an import sheet, one batch at a time.
+
+    Every check runs over whole columns, and each failing cell becomes one
+    entry in the error report. Duplicate roll numbers are tracked across
+    batches, so the first occurrence in the file is kept and later ones are
+    reported, matching what the importer does with duplicates.
+    """
+
+    def __init__(self, test_columns=()):
+        self.test_columns = list(test_columns)
+        self.seen_keys = set()
+        self.errors = []
+        self.invalid_rows = set()
+        self.rows_checked = 0
+
+    def validate(self, df):
+        """Check a batch, returns a boolean mask of its valid rows"""
+        df = normalize_frame(df.copy())
+        problems = []
+
+        for column in ['Roll', 'Name']:
+            text = df[column].astype(str).str.strip()
+            problems.append((column, df[column].isna() | (text == ''), 'Value is missing'))
+
+        dob = pd.to_datetime(df['DOB'], format='%Y-%m-%d', errors='coerce')
+        problems.append(('DOB', dob.isna(), 'Invalid date, expected YYYY-MM-DD'))
+        problems.append(('DOB', dob > pd.Timestamp.now(), 'Date of birth is in the future'))
+
+        for column, (low, high) in [('Height', HEIGHT_RANGE), ('Weight', WEIGHT_RANGE)]:
+            values = pd.to_numeric(df[column], errors='coerce')
+            problems.append((column, values.isna(), 'Not a number'))
+            problems.append((column, (values < low) | (values > high), f'Out of range ({low}-{high})'))
+
+        problems.append(('Class', ~df['Class'].isin(GRADES), f'Unknown grade, expected one of: {", ".join(GRADES)}'))
+        problems.append(('Section', ~df['Section'].isin(SECTIONS), f'Unknown section, expected one of: {", ".join(SECTIONS)}'))
+
+        gender = df['Gender'].astype(str).str.strip().str.upper().str[:1]
+        problems.append(('Gender', ~gender.isin(['M', 'F']), 'Expected Male or Female'))
+
+        for column in self.test_columns:
+            scores = pd.to_numeric(df[column], errors='coerce')
+            problems.append((column, df[column].notna() & scores.isna(), 'Not a number'))
+
+        keys = pd.Series(list(zip(df['Class'], df['Section'], df['Roll'])), index=df.index)
+        duplicated = keys.duplicated() | keys.isin(self.seen_keys)
+        problems.append(('Roll', duplicated, 'Duplicate roll number in this class'))
+        self.seen_keys.update(keys)
+
+        invalid = np.zeros(len(df), dtype=bool)
+        for column, mask, message in problems:
+            mask = mask.fillna(False).to_numpy(dtype=bool)
+            if not mask.any():
+                continue
+            invalid |= mask
+            for index in df.index[mask]:
+                self.errors.append((index + 2, column, df.at[index, column], message))
+
+        self.invalid_rows.update(int(index) for index in df.index[invalid])
+        self.rows_checked += len(df)
+        return ~invalid
+
+    def write_report(self, handle):
+        """Write every error found so far as CSV, ordered by row"""
+        writer = csv.writer(handle)
+        writer.writerow(ERROR_REPORT_HEADER)
+        for row, column, value, message in sorted(self.errors, key=lambda error: error[0]):
+            writer.writerow([row, column, '' if pd.isna(value) else value, message])
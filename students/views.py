@@ -1,15 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Q
-from .models import Student, PhysicalTest, StudentTestResult
+from django.urls import reverse, reverse_lazy
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from .models import Student, PhysicalTest, StudentTestResult, ImportJob
 from .forms import StudentForm, ImportStudentsForm
-import pandas as pd
-from datetime import datetime
+from .importer import REQUIRED_COLUMNS
+from .jobs import enqueue_import
+from .readers import SheetReader
+from .search import search_students, get_search_backend
 from schools.models import Class
 
+TYPEAHEAD_LIMIT = 10
+RESULT_HISTORY_TERMS = 6
+
 class StudentListView(ListView):
     model = Student
     template_name = 'students/student_list.html'
@@ -20,11 +24,7 @@ class StudentListView(ListView):
         queryset = Student.objects.select_related('class_assigned__school').all()
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(roll_number__icontains=search_query) |
-                Q(class_assigned__school__name__icontains=search_query)
-            )
+            queryset = search_students(queryset, search_query)
         return queryset
 
     def get_context_data(self, **kwargs):
@@ -39,7 +39,8 @@ class StudentDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['test_results'] = self.object.test_results.all()
+        context['test_results'] = self.object.test_results.latest_scores().select_related('test')
+        context['result_history'] = self.object.test_results.trend(RESULT_HISTORY_TERMS).select_related('test')
         return context
 
 class StudentCreateView(CreateView):
@@ -70,78 +71,28 @@ def import_students(request):
                 excel_file = request.FILES['excel_file']
                 school = form.cleaned_data['school']
 
-                # Read Excel file
-                df = pd.read_excel(excel_file)
-
-                # Expected columns
-                required_columns = ['Roll', 'Name', 'Class', 'Section', 'DOB', 'Gender', 'Height', 'Weight']
+                # Only the header is read here, rows are imported by the worker
+                reader = SheetReader(excel_file)
 
                 # Check if all required columns exist
-                missing_columns = [col for col in required_columns if col not in df.columns]
+                missing_columns = [col for col in REQUIRED_COLUMNS if col not in reader.columns]
                 if missing_columns:
                     messages.error(request, f'Missing columns: {", ".join(missing_columns)}')
                     return render(request, 'students/import_students.html', {'form': form})
 
-                imported_count = 0
-                errors = []
-
-                for index, row in df.iterrows():
-                    try:
-                        # Get or create class
-                        from schools.models import Class
-                        class_obj, created = Class.objects.get_or_create(
-                            school=school,
-                            grade=str(row['Class']),
-                            section=str(row['Section']),
-                        )
-
-                        # Parse date of birth
-                        if isinstance(row['DOB'], str):
-                            dob = datetime.strptime(row['DOB'], '%Y-%m-%d').date()
-                        else:
-                            dob = row['DOB'].date() if hasattr(row['DOB'], 'date') else row['DOB']
-
-                        # Create student
-                        student, created = Student.objects.get_or_create(
-                            roll_number=str(row['Roll']),
-                            class_assigned=class_obj,
-                            defaults={
-                                'name': str(row['Name']),
-                                'date_of_birth': dob,
-                                'gender': 'M' if str(row['Gender']).upper().startswith('M') else 'F',
-                                'height': float(row['Height']),
-                                'weight': float(row['Weight']),
-                            }
-                        )
-
-                        if created:
-                            imported_count += 1
-
-                        # Import physical test data if available
-                        test_columns = ['Flamingo Balance', 'Plate Tapping']
-                        for test_col in test_columns:
-                            if test_col in df.columns and pd.notna(row[test_col]):
-                                test, created = PhysicalTest.objects.get_or_create(
-                                    name=test_col,
-                                    defaults={'unit': 'falls' if 'Flamingo' in test_col else 'seconds'}
-                                )
-
-                                StudentTestResult.objects.get_or_create(
-                                    student=student,
-                                    test=test,
-                                    defaults={'score': float(row[test_col])}
-                                )
-
-                    except Exception as e:
-                        errors.append(f'Row {index + 2}: {str(e)}')
-
-                if imported_count > 0:
-                    messages.success(request, f'Successfully imported {imported_count} students!')
-
-                if errors:
-                    messages.warning(request, f'Errors encountered: {"; ".join(errors[:5])}')
-
-                return redirect('students:list')
+                job = enqueue_import(
+                    school,
+                    excel_file,
+                    mode=form.cleaned_data['mode'],
+                    on_error=form.cleaned_data['on_error'],
+                    dry_run=form.cleaned_data['dry_run'],
+                    test_date=form.cleaned_data['test_date'],
+                )
+                if job.dry_run:
+                    messages.success(request, f'Dry run queued ({job.total_rows} rows). Nothing will be imported.')
+                else:
+                    messages.success(request, f'Import queued ({job.total_rows} rows). Progress is shown below.')
+                return redirect(job)
 
             except Exception as e:
                 messages.error(request, f'Error processing file: {str(e)}')
@@ -150,6 +101,59 @@ def import_students(request):
 
     return render(request, 'students/import_students.html', {'form': form})
 
+def import_job_errors(request, pk):
+    """Download the validation error report of an import job"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    if not job.error_report:
+        raise Http404('This import has not been validated yet')
+    return FileResponse(job.error_report.open('rb'), as_attachment=True, filename=f'import_{job.pk}_errors.csv')
+
+class ImportJobDetailView(DetailView):
+    model = ImportJob
+    template_name = 'students/import_job.html'
+    context_object_name = 'job'
+
+def import_job_progress(request, pk):
+    """JSON progress of an import job, polled by the job page"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'total_rows': job.total_rows,
+        'rows_processed': job.rows_processed,
+        'imported_count': job.imported_count,
+        'updated_count': job.updated_count,
+        'unchanged_count': job.unchanged_count,
+        'error_count': len(job.row_errors),
+        'errors': job.row_errors[:5],
+        'validated': job.validated,
+        'invalid_count': len(job.invalid_rows),
+        'error_report_url': reverse('students:import_job_errors', kwargs={'pk': job.pk}) if job.error_report else None,
+        'dry_run': job.dry_run,
+        'error_message': job.error_message,
+        'duration': job.duration,
+        'finished': job.is_finished,
+    })
+
+def search_typeahead(request):
+    """AJAX view returning the best matching students for a search box"""
+    query = request.GET.get('q', '').strip()
+    results = []
+
+    if len(query) >= 2:
+        matches = get_search_backend().top_matches(query, TYPEAHEAD_LIMIT).select_related('class_assigned__school')
+        for student in matches:
+            results.append({
+                'id': student.pk,
+                'name': student.name,
+                'roll_number': student.roll_number,
+                'class': f"Grade {student.class_assigned.grade} - {student.class_assigned.section}",
+                'school': student.class_assigned.school.name,
+                'url': student.get_absolute_url(),
+            })
+
+    return JsonResponse({'results': results})
+
 def get_classes_by_school(request):
     """AJAX view to get classes filtered by school"""
     school_id = request.GET.get('school_id')